@@ -0,0 +1,132 @@
+#	BloomFilter.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# Bloom filter of the hashes of a global sets table (-gbf). A hash not in the filter is surely not in the table, so only
+# the probable hits are looked up in the database, and the filter takes about 10 bits per row instead of a dict entry.
+# The hashes are SHA1 hashes, uniform already: the k bit positions of a hash are h1 + i * h2 modulo the number of bits,
+# with h1 and h2 its first two 8 byte words (double hashing).
+# The filter is saved next to the database with the number of rows of the table it was built from. It's rebuilt when
+# the table has another number of rows at start-up, i.e. when rows were added by another run or machine.
+
+import os
+import math
+import numpy as np
+from configs import *
+
+BLOOM_MAGIC = b'NDPBLOOM'
+MASK64 = (1 << 64) - 1
+
+class BloomFilter:
+
+	# a filter of capacity items with the given false positive rate
+	def __init__(self, capacity, error_rate=BLOOM_ERROR):
+		self.bits_count = max(64, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+		self.hashes_count = max(1, round(self.bits_count / capacity * math.log(2)))
+		self.bits = bytearray((self.bits_count + 7) // 8)
+		self.items = 0
+
+	def get_positions(self, item):
+		h1 = int.from_bytes(item[:8], 'little')
+		h2 = int.from_bytes(item[8:16], 'little') | 1
+		return [((h1 + i * h2) & MASK64) % self.bits_count for i in range(self.hashes_count)]
+
+	# an item counts if it sets a bit, i.e. it wasn't in the filter yet
+	def add(self, item):
+		new = False
+		for position in self.get_positions(item):
+			bit = 1 << (position & 7)
+			if not self.bits[position >> 3] & bit:
+				self.bits[position >> 3] |= bit
+				new = True
+		if new:
+			self.items += 1
+
+	def __contains__(self, item):
+		bits = self.bits
+		for position in self.get_positions(item):
+			if not bits[position >> 3] & (1 << (position & 7)):
+				return False
+		return True
+
+	# add the hashes of the given size kept in one bytes block, at once. Like add(), only the hashes that weren't in the
+	# filter before the block count, the hashes of a block are expected to be distinct
+	def add_block(self, hashes, hash_size):
+		words = np.frombuffer(hashes, dtype=np.uint8).reshape(-1, hash_size)[:, :16].copy().view('<u8')
+		h1, h2 = words[:, 0], words[:, 1] | np.uint64(1)
+		bits = np.frombuffer(self.bits, dtype=np.uint8)
+		present = np.ones(len(words), dtype=bool)
+		with np.errstate(over='ignore'):
+			positions = [(h1 + np.uint64(i) * h2) % np.uint64(self.bits_count) for i in range(self.hashes_count)]
+		for i_positions in positions:
+			byte_positions = (i_positions >> np.uint64(3)).astype(np.int64)
+			masks = np.uint8(1) << (i_positions & np.uint64(7)).astype(np.uint8)
+			present &= (bits[byte_positions] & masks) != 0
+		for i_positions in positions:
+			np.bitwise_or.at(bits, (i_positions >> np.uint64(3)).astype(np.int64), np.uint8(1) << (i_positions & np.uint64(7)).astype(np.uint8))
+		self.items += int(np.count_nonzero(~present))
+
+	# the false positive rate of the filter as it's filled now
+	def get_error_rate(self):
+		filled = int(np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8)).sum()) / (len(self.bits) * 8)
+		return filled ** self.hashes_count
+
+	def size_in_bytes(self):
+		return len(self.bits)
+
+	# save the filter with the number of rows of the table it holds, the file is replaced at once
+	def save(self, file_name, rows):
+		temp_file_name = file_name + ".tmp"
+		with open(temp_file_name, 'wb') as file:
+			file.write(BLOOM_MAGIC)
+			for value in (self.bits_count, self.hashes_count, self.items, rows):
+				file.write(value.to_bytes(8, 'little'))
+			file.write(self.bits)
+		os.replace(temp_file_name, file_name)
+
+	# returns the filter saved in the file and the number of rows of its table, or None and 0 if there's no valid file
+	@staticmethod
+	def load(file_name):
+		try:
+			with open(file_name, 'rb') as file:
+				if file.read(len(BLOOM_MAGIC)) != BLOOM_MAGIC:
+					return None, 0
+				bits_count, hashes_count, items, rows = (int.from_bytes(file.read(8), 'little') for _ in range(4))
+				bloom_filter = BloomFilter.__new__(BloomFilter)
+				bloom_filter.bits_count, bloom_filter.hashes_count, bloom_filter.items = bits_count, hashes_count, items
+				bloom_filter.bits = bytearray(file.read())
+				if len(bloom_filter.bits) != (bits_count + 7) // 8:
+					return None, 0
+				return bloom_filter, rows
+		except OSError:
+			return None, 0
+
+
+# returns the filter of the table, loaded from the file if it holds all rows of the table and isn't too full, otherwise
+# built from the hashes of the table and saved. And the number of rows of the table
+def load_gdb_filter(db_adaptor, table_name, file_name):
+	rows = db_adaptor.gs_count_rows(table_name)
+	bloom_filter, filter_rows = BloomFilter.load(file_name)
+	if bloom_filter is None or filter_rows != rows or bloom_filter.get_error_rate() > 2 * BLOOM_ERROR:
+		bloom_filter = BloomFilter(max(2 * rows, BLOOM_MIN_ITEMS))
+		for hashes in db_adaptor.gs_iterate_hashes(table_name):
+			bloom_filter.add_block(b''.join(hashes), len(hashes[0]))
+		bloom_filter.save(file_name, rows)
+	return bloom_filter, rows
@@ -0,0 +1,59 @@
+#	CancelFlag.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# Cluster-wide signal to stop solving, used with --exit-upon-solving. The worker that finds a solution sets the flag,
+# the other workers check it every CANCEL_POLL_NODES nodes and return what they have.
+# The flag keeps the time it was set first, i.e. when the first solution was found.
+# The flag is kept by an actor for the Ray backend, see Executors.LocalCancelFlag for the local backend.
+
+import time
+import ray
+from configs import *
+
+@ray.remote(num_cpus=0)
+class CancelFlagActor:
+
+	def __init__(self):
+		self.set_time = None
+
+	def set(self):
+		if self.set_time is None:
+			self.set_time = time.time()
+
+	def get_time(self):
+		return self.set_time
+
+
+class CancelFlag:
+
+	def __init__(self):
+		self.actor = CancelFlagActor.remote()
+
+	def set(self):
+		self.actor.set.remote()
+
+	# returns the time the flag was set, None if it's not set
+	def get_time(self):
+		return ray.get(self.actor.get_time.remote())
+
+	def shutdown(self):
+		ray.kill(self.actor)
+
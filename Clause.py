@@ -63,8 +63,28 @@ class Clause:
 
         # in case both are identical values up until shortlen, then put the shorter first
         return len(self.raw) < len(other.raw)
+
+    # every literal encoded as 2 * var + 1 if negated, 2 * var otherwise, in the given order. Tuples of encoded literals
+    # compare by absolute value, +5 before -5, and the shorter clause first if it's a prefix of the other, i.e. like
+    # __lt__. The Normalizer works on clauses in this encoding (see Normalizer.encode())
+    @staticmethod
+    def encode_literals(raw):
+        return tuple([(abs(v) << 1) | (v < 0) for v in raw])
+
+    # key giving the same order as __lt__, to sort clauses without calling a python comparator on every comparison.
+    def get_sort_key(self):
+        return Clause.encode_literals(self.raw)
     
 
+    # a new clause with the given literals and the other attributes of this one. Clauses are shared between a set and
+    # its children (see Set.evaluate()), so they are replaced instead of changed in place
+    def with_raw(self, raw, substituted=None):
+        cl = Clause(None)
+        cl.raw = raw
+        cl.initial_index = self.initial_index
+        cl.substituted = self.substituted if substituted == None else substituted
+        return cl
+
     def sort(self):
         x = sorted(self.raw, key = abs)
         self.raw = x
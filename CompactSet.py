@@ -0,0 +1,219 @@
+#	CompactSet.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# CompactSet is a Set whose clauses are not kept as a list of Clause objects, but packed in flat arrays:
+#   literals:        all the literals of the set, clause after clause
+#   offsets:         start of every clause in literals, plus one extra entry for the end of the last clause
+#   initial_indices: initial index of every clause (parallel to offsets)
+#   substituted:     the substituted flag of every clause (parallel to offsets)
+#
+# A node in the tree then costs four array objects instead of one Clause object (with its own raw list and attributes dict)
+# per clause. The clauses property still returns Clause objects so the rest of the code can read the set as before,
+# but these objects are built on demand and writing to them doesn't change the set. Assign a list to clauses instead.
+
+import sys
+from array import array
+from configs import *
+from Clause import Clause
+from Set import Set
+from Normalizer import Normalizer
+
+class CompactSet(Set):
+
+    def __init__(self, str_input=None, id=0, properties=None):
+        self.literals = array('i')
+        self.offsets = array('I', [0])
+        self.initial_indices = array('I')
+        self.substituted = bytearray()
+        super().__init__(str_input, id, properties)
+
+    # convert a Set object into a CompactSet, keeping all its attributes
+    @classmethod
+    def from_set(cls, cnf_set):
+        compact_set = cls()
+        for k, v in cnf_set.__dict__.items():
+            if k != 'clauses':
+                setattr(compact_set, k, v)
+        compact_set.clauses = cnf_set.clauses
+        return compact_set
+
+    @property
+    def clauses(self):
+        clauses = []
+        offsets = self.offsets
+        for i in range(len(self.initial_indices)):
+            cl = Clause(None)
+            cl.raw = self.literals[offsets[i]:offsets[i+1]].tolist()
+            cl.initial_index = self.initial_indices[i]
+            cl.substituted = bool(self.substituted[i])
+            clauses.append(cl)
+        return clauses
+
+    @clauses.setter
+    def clauses(self, clauses):
+        self.literals = array('i')
+        self.offsets = array('I', [0])
+        self.initial_indices = array('I')
+        self.substituted = bytearray()
+        for cl in clauses:
+            self.append_clause(cl.raw, cl.initial_index, cl.substituted)
+
+    def append_clause(self, raw, initial_index, substituted=False):
+        self.literals.extend(raw)
+        self.offsets.append(len(self.literals))
+        self.initial_indices.append(initial_index)
+        self.substituted.append(substituted)
+
+    def clauses_count(self):
+        return len(self.initial_indices)
+
+    def add_clause(self, cl):
+        # no need to add new clauses if the set is already evaluated previous to False
+        if self.value == False:
+            return
+
+        if cl.value == False:
+            self.set_value(False)
+        elif cl.value == True and self.clauses_count() == 0:
+            self.set_value(True)
+        elif cl.value == None:
+            self.append_clause(cl.raw, cl.initial_index, cl.substituted)
+            self.set_value(None)
+
+    # convert to L.O. condition with the Normalizer, directly from the arrays and back
+    def to_lo_condition(self, mode=MODE_LO, sort_by_size=False, thief_method=False):
+        literals = self.literals
+        offsets = self.offsets
+        clauses = [Normalizer.encode(literals[offsets[i]:offsets[i+1]]) for i in range(self.clauses_count())]
+
+        normalizer = Normalizer(mode, sort_by_size, thief_method, self.pivot_method)
+        order, clauses, self.final_names_map, self.highest_occurring_var, self.lo_rounds, self.pivot = normalizer.normalize(clauses, self.initial_indices, self.final_names_map)
+
+        initial_indices = self.initial_indices
+        substituted = self.substituted
+        self.literals = array('i')
+        self.offsets = array('I', [0])
+        self.initial_indices = array('I')
+        self.substituted = bytearray()
+        for pos, clause in zip(order, clauses):
+            self.append_clause(Normalizer.decode(clause), initial_indices[pos], substituted[pos])
+
+        return self.lo_rounds
+
+    # evaluate the set and produce two branches, same as Set.evaluate() but copying literals between the arrays only
+    def evaluate(self):
+
+        # sanity check
+        if self.clauses_count() <= 0 or self.offsets[1] == 0:
+            return (None, None)
+
+        literals = self.literals
+        offsets = self.offsets
+
+        # pick the variable to evaluate based on it, the left most one by default
+        pivot = self.get_pivot()
+
+        left_set = CompactSet()
+        right_set = CompactSet()
+
+        for i in range(0, self.clauses_count()):
+            raw = literals[offsets[i]:offsets[i+1]]
+            initial_index = self.initial_indices[i]
+            if pivot in raw:
+                # for left branch, the clause will be set to true
+                # for right branch, remove the var from the clause, if it's the last variable, then the right set is False
+                if len(raw) > 1:
+                    raw.remove(pivot)
+                    right_set.append_clause(raw, initial_index, True)
+                else:
+                    right_set.set_value(False)
+
+            elif -pivot in raw:
+                if len(raw) > 1:
+                    raw.remove(-pivot)
+                    left_set.append_clause(raw, initial_index, True)
+                else:
+                    left_set.set_value(False)
+
+            else:
+                left_set.append_clause(raw, initial_index)
+                right_set.append_clause(raw, initial_index)
+
+        for sset in (left_set, right_set):
+            if sset.clauses_count() == 0 and sset.value == None:
+                sset.set_value(True)
+
+        # set a map to the original variables in each set
+        for sset in (left_set, right_set):
+            vars = sset.get_variables()
+            sset.original_values = {v:self.original_values[self.final_names_map[v-1]] for v in vars}
+
+        left_set.evaluated_vars = {**self.evaluated_vars, self.original_values[self.final_names_map[abs(pivot)-1]]:True}
+        right_set.evaluated_vars = {**self.evaluated_vars, self.original_values[self.final_names_map[abs(pivot)-1]]:False}
+
+        return (left_set, right_set)
+
+    def to_string(self, pretty=True, only_evaluated_clauses=False):
+
+        # if the set evaluates to a value
+        if self.value != None:
+            return str(self.value)[0]
+
+        # This shouldn't ever happen. If the set doesn't have a value, then it must has clauses
+        if self.clauses_count() == 0:
+            raise ValueError('A set with empty clauses and no evaluated values!')
+
+        literals = self.literals
+        offsets = self.offsets
+        res_arr = []
+        for i in range(0, self.clauses_count()):
+            if offsets[i] == offsets[i+1]:
+                continue
+            if only_evaluated_clauses and not self.substituted[i]:
+                continue
+
+            raw = literals[offsets[i]:offsets[i+1]]
+            if pretty:
+                res_arr.append('(' + ' | '.join(map(str, raw)) + f')[{self.initial_indices[i]}]')
+            else:
+                res_arr.append('|'.join(map(str, raw)))
+
+        if pretty:
+            return ' & '.join(res_arr)
+        return '&'.join(res_arr)
+
+    # same encoding as Set.get_encoding(), the arrays already hold it
+    def get_encoding(self):
+        if self.value != None:
+            return str(self.value)[0].encode()
+
+        packed = array('I', [self.clauses_count()])
+        packed.extend(self.offsets[1:])
+        if sys.byteorder == 'big':
+            literals = array('i', self.literals)
+            packed.byteswap()
+            literals.byteswap()
+            return packed.tobytes() + literals.tobytes()
+        return packed.tobytes() + self.literals.tobytes()
+
+    # return a list of variables in the set
+    def get_variables(self):
+        return list(set(map(abs, self.literals)))
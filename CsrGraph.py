@@ -0,0 +1,75 @@
+#	CsrGraph.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# The finished graph of a solve in compressed sparse row form. The nodes get integer ids, the root is node 0 and the
+# others follow in the order of nodes_children. The children of node n are children[offsets[n]:offsets[n + 1]], and
+# the hashes of all nodes are kept in one bytes block, in the order of their ids.
+# It takes a few bytes per node and edge instead of a dict of lists of bytes, and it's sent to the workers as a few
+# numpy arrays, which Ray keeps in its object store without copying them for every task.
+
+import numpy as np
+from configs import *
+
+class CsrGraph:
+
+	def __init__(self, nodes_children, root_id):
+		node_hashes = [root_id] + [node_hash for node_hash in nodes_children if node_hash != root_id]
+		index = {node_hash: node for node, node_hash in enumerate(node_hashes)}
+
+		counts = np.fromiter((len(nodes_children[node_hash]) for node_hash in node_hashes), dtype=np.int64, count=len(node_hashes))
+		self.offsets = np.zeros(len(node_hashes) + 1, dtype=np.int64)
+		np.cumsum(counts, out=self.offsets[1:])
+		id_type = np.int32 if len(node_hashes) < 2**31 else np.int64
+		self.children = np.fromiter((index[child_hash] for node_hash in node_hashes for child_hash in nodes_children[node_hash]),
+			dtype=id_type, count=int(self.offsets[-1]))
+
+		# all hashes of a solve have the same size
+		self.hash_size = len(root_id)
+		self.hashes = b''.join(node_hashes)
+		if len(self.hashes) != self.hash_size * len(node_hashes):
+			raise ValueError("the hashes of the nodes don't have the same size")
+		self.index = None
+
+	def size(self):
+		return len(self.offsets) - 1
+
+	def edges_count(self):
+		return len(self.children)
+
+	def get_children(self, node):
+		return self.children[self.offsets[node]:self.offsets[node + 1]]
+
+	def get_hash(self, node):
+		return self.hashes[node * self.hash_size:(node + 1) * self.hash_size]
+
+	# the hash to id table is built on first use
+	def get_id(self, node_hash):
+		if self.index is None:
+			self.index = {self.get_hash(node): node for node in range(self.size())}
+		return self.index[node_hash]
+
+	# returns the offsets and the children as lists, much faster than numpy arrays to walk one node at a time
+	def to_lists(self):
+		return self.offsets.tolist(), self.children.tolist()
+
+	# returns the in-degree of every node
+	def parents_count(self):
+		return np.bincount(self.children, minlength=self.size())
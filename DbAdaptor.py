@@ -19,40 +19,109 @@
 #	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
 #
 
+import os
 import time
+import threading
+import traceback
+from collections import defaultdict
 import psycopg2
 from configs import *
 import hashlib
 from psycopg2 import sql
 import psycopg2.extras
+from DbBackends import BufferedDbAdapter, keep_inherited
 
 # helpful query: select id, cid1 is null as cid1_is_null, cid2 is null as cid2_is_null from cnf_1560847944_097688;
 
-class DbAdapter:
-
-
-    def __init__(self):
-        self.conn_string = "host={} port={} dbname={} user={} password={}".format(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD)
-        #self.conn_string = "host={} port={} dbname={} user={} password={} options='-c lock_timeout=1000'".format(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD)
-        self.conn = None
-        self.cur = None
-
-        # connect to the PostgreSQL server
-        self.conn = psycopg2.connect(self.conn_string, cursor_factory=psycopg2.extras.DictCursor)
+# The writes to the global sets table are buffered (see BufferedDbAdapter in DbBackends.py), a batch is written through
+# a temporary table, in one transaction. The hash of the table is a deferrable key, which ON CONFLICT doesn't support,
+# so the rows already in the table are skipped by the INSERT ... SELECT itself. The reads look into the buffered rows
+# first. gs_flush() writes what's left, it's called at the end of a solve and on delete.
+#
+# All DbAdapters of a process share the connections of a pool: a DbAdapter takes one when it's created and gives it back
+# when it's deleted, so the solvers, the queues and the queues relinked after every worker result don't open a new
+# connection each. A DbAdapter is sent to another process without its connection, it takes one from the pool there.
+# The hot queries are prepared once per connection and table, and run with EXECUTE.
+
+# connections per process, forked workers can't use the connections of their parent
+pool_lock = threading.Lock()
+pool_pid = None
+idle_connections = []
+# names of the statements prepared on every connection
+prepared_statements = {}
+# connections opened, and the calls and seconds of every prepared statement of this process
+counters = defaultdict(float)
+
+def get_connection():
+    global pool_pid, idle_connections
+    with pool_lock:
+        if pool_pid != os.getpid():
+            # the connections of the parent share their sockets with its sessions, see DbBackends.inherited_connections
+            if pool_pid is not None:
+                keep_inherited(*idle_connections, *prepared_statements)
+            pool_pid = os.getpid()
+            idle_connections = []
+            prepared_statements.clear()
+        if idle_connections:
+            return idle_connections.pop()
+
+    conn_string = "host={} port={} dbname={} user={} password={}".format(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD)
+    #conn_string = "host={} port={} dbname={} user={} password={} options='-c lock_timeout=1000'".format(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD)
+    conn = psycopg2.connect(conn_string, cursor_factory=psycopg2.extras.DictCursor)
+    counters['connections'] += 1
+    return conn
+
+def put_connection(conn):
+    with pool_lock:
+        if pool_pid == os.getpid() and len(idle_connections) < DB_POOL_SIZE and not conn.closed:
+            conn.rollback()
+            idle_connections.append(conn)
+            return
+        prepared_statements.pop(conn, None)
+    conn.close()
+
+# returns a copy of the counters of this process
+def get_counters():
+    return dict(counters)
+
+class DbAdapter(BufferedDbAdapter):
+
+    # take a connection to the PostgreSQL server from the pool
+    def connect(self):
+        self.pid = os.getpid()
+        self.conn = get_connection()
         self.cur = self.conn.cursor()
 
-
-    def __del__(self):
-        try:
-            # close communication with the PostgreSQL database server
-
-            # commit and close the connection
-            if self.conn is not None:
-                self.conn.commit()
-                self.cur.close()
-                self.conn.close()
-        except (Exception, psycopg2.DatabaseError) as error:
-            logger.error("DB Error: " + str(error))
+    # commit and give the connection back to the pool
+    def close(self):
+        self.conn.commit()
+        self.cur.close()
+        put_connection(self.conn)
+
+    def get_counters(self):
+        return get_counters()
+
+    # run a query prepared once per connection and table. The query has the table as {table} and the parameters as $1,
+    # $2 ..., the calls and the time of every name are counted
+    def execute_prepared(self, name, table_name, query, params):
+        statement = "{0}_{1}".format(name, hashlib.md5(table_name.encode()).hexdigest()[:16])
+        prepared = prepared_statements.setdefault(self.conn, set())
+        if statement not in prepared:
+            self.cur.execute(sql.SQL("PREPARE {statement} AS " + query).format(statement=sql.Identifier(statement), table=sql.Identifier(table_name)))
+            prepared.add(statement)
+
+        start_time = time.perf_counter()
+        self.cur.execute(sql.SQL("EXECUTE {0} ({1})").format(sql.Identifier(statement), sql.SQL(', ').join(sql.Placeholder() * len(params))), params)
+        counters[name + '_calls'] += 1
+        counters[name + '_time'] += time.perf_counter() - start_time
+
+    # drop the statements prepared for a table on this connection
+    def deallocate_prepared(self, table_name):
+        suffix = "_" + hashlib.md5(table_name.encode()).hexdigest()[:16]
+        prepared = prepared_statements.get(self.conn, set())
+        for statement in [statement for statement in prepared if statement.endswith(suffix)]:
+            self.cur.execute(sql.SQL("DEALLOCATE {0}").format(sql.Identifier(statement)))
+            prepared.discard(statement)
 
     ### GlobalSetsTable methods ###
 
@@ -100,28 +169,64 @@ class DbAdapter:
             logger.error("DB Error: " + str(error))
 
 
-    def gs_insert_row(self, table_name, hash, set_body, child1_hash, child2_hash, mapping, num_of_clauses, num_of_vars):
-
-        """ insert a row item into the table """
-        success = SUCCESS
-        try:
-            # execute the INSERT statement
-            #self.cur.execute(sql.SQL("insert into {} values (%s, %s)").format(sql.Identifier('my_table')), [10, 20])
-            self.cur.execute(sql.SQL("INSERT INTO {0}(hash, body, cid1, cid2, mapping, num_of_clauses, num_of_vars) VALUES(%s, %s, %s, %s, %s, %s, %s)").format(sql.Identifier(table_name)), (hash, set_body, child1_hash, child2_hash, mapping, num_of_clauses, num_of_vars))
-            self.conn.commit()
-        except (Exception, psycopg2.errors.UniqueViolation) as UniqueViolationError:
-            success = DB_UNIQUE_VIOLATION
-            logger.debug("Node is already found in the global DB")
-        except (Exception, psycopg2.DatabaseError) as error:
-            logger.error("DB Error: " + str(error))
-            success = DB_UNKNOWN_ERROR
+    # the temporary tables of the buffered writes, they're emptied at the end of every transaction
+    def gs_create_temp_tables(self):
+        self.cur.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS pending_rows (
+                hash BYTEA,
+                body TEXT,
+                cid1 BYTEA,
+                cid2 BYTEA,
+                mapping INTEGER[],
+                num_of_clauses INTEGER,
+                num_of_vars INTEGER
+            ) ON COMMIT DELETE ROWS
+            """)
+        self.cur.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS pending_counts (
+                hash BYTEA,
+                unique_nodes INTEGER,
+                redundant_nodes INTEGER,
+                redundant_hits INTEGER
+            ) ON COMMIT DELETE ROWS
+            """)
+        self.cur.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS pending_times (
+                hash BYTEA,
+                redundant_times INTEGER
+            ) ON COMMIT DELETE ROWS
+            """)
+
+    # write a batch of rows, returns the set of the hashes inserted, or None on error.
+    # A row written by another process meanwhile makes the commit fail on the deferred key, the batch is retried once
+    # without it
+    def write_rows(self, table_name, rows):
+        for attempt in range(2):
+            try:
+                self.gs_create_temp_tables()
+                psycopg2.extras.execute_values(self.cur, "INSERT INTO pending_rows VALUES %s", list(rows.values()), page_size=len(rows))
+                self.cur.execute(sql.SQL("""
+                        INSERT INTO {0}(hash, body, cid1, cid2, mapping, num_of_clauses, num_of_vars)
+                        SELECT * FROM pending_rows
+                        WHERE NOT EXISTS (SELECT 1 FROM {0} WHERE {0}.hash = pending_rows.hash)
+                        RETURNING hash
+                    """).format(sql.Identifier(table_name)))
+                inserted = {bytes(row[0]) for row in self.cur.fetchall()}
+                self.conn.commit()
+                return inserted
+            except (Exception, psycopg2.DatabaseError) as error:
+                self.conn.rollback()
+                if attempt:
+                    logger.error("DB Error: " + str(error))
 
-        return success
+        return None
 
     def gs_does_hash_exist(self, table_name, value):
+        if value in self.pending_rows.get(table_name, {}):
+            return True
         result = False
         try:
-            self.cur.execute(sql.SQL("SELECT 1 FROM {0} WHERE hash = %s LIMIT 1").format(sql.Identifier(table_name)), (value, ))
+            self.execute_prepared("gs_does_hash_exist", table_name, "SELECT 1 FROM {table} WHERE hash = $1 LIMIT 1", (value, ))
             result = bool(self.cur.rowcount)
         except (Exception, psycopg2.DatabaseError) as error:
             logger.error("DB Error: " + str(error))
@@ -132,6 +237,8 @@ class DbAdapter:
     # check if a set is solved.
     # A solved set should have unique_nodes greater than zero
     def gs_is_hash_solved(self, table_name, value):
+        if value in self.pending_counts.get(table_name, {}):
+            return bool(self.pending_counts[table_name][value][1])
         result = False
         try:
             self.cur.execute(sql.SQL("SELECT unique_nodes FROM {0} WHERE hash = %s").format(sql.Identifier(table_name)), (value, ))
@@ -143,31 +250,30 @@ class DbAdapter:
             result = False
         return result
 
-    def gs_update_count(self, table_name, unique_nodes, redundant_nodes, redundant_hits, hash):
-        result = False
-        try:
-            self.cur.execute(sql.SQL("UPDATE {0} SET unique_nodes = %s, redundant_nodes = %s, redundant_hits = %s WHERE hash = %s").format(sql.Identifier(table_name)), (unique_nodes, redundant_nodes, redundant_hits, hash))
-            self.conn.commit()
-            # get result
-            result = bool(self.cur.rowcount)
-        except (Exception, psycopg2.DatabaseError) as error:
-            logger.error("DB Error: " + str(error))
-            logger.critical("Error - {0}".format(traceback.format_exc()))
-            result = False
-
-        return result
-
-    def gs_update_redundant_times(self, table_name, redundant_times, hash):
+    # write a batch of counts and redundant times, returns False on error
+    def write_counts(self, table_name, counts, times):
         result = False
         try:
-            self.cur.execute(sql.SQL("UPDATE {0} SET redundant_times = redundant_times + %s WHERE hash = %s").format(sql.Identifier(table_name)), (redundant_times, hash))
+            self.gs_create_temp_tables()
+            if counts:
+                psycopg2.extras.execute_values(self.cur, "INSERT INTO pending_counts VALUES %s", list(counts.values()), page_size=len(counts))
+                self.cur.execute(sql.SQL("""
+                        UPDATE {0} SET unique_nodes = pending_counts.unique_nodes, redundant_nodes = pending_counts.redundant_nodes,
+                        redundant_hits = pending_counts.redundant_hits
+                        FROM pending_counts WHERE {0}.hash = pending_counts.hash
+                    """).format(sql.Identifier(table_name)))
+            if times:
+                psycopg2.extras.execute_values(self.cur, "INSERT INTO pending_times VALUES %s", list(times.items()), page_size=len(times))
+                self.cur.execute(sql.SQL("""
+                        UPDATE {0} SET redundant_times = {0}.redundant_times + pending_times.redundant_times
+                        FROM pending_times WHERE {0}.hash = pending_times.hash
+                    """).format(sql.Identifier(table_name)))
             self.conn.commit()
-            # get result
-            result = bool(self.cur.rowcount)
+            result = True
         except (Exception, psycopg2.DatabaseError) as error:
+            self.conn.rollback()
             logger.error("DB Error: " + str(error))
             logger.critical("Error - {0}".format(traceback.format_exc()))
-            result = False
 
         return result
 
@@ -185,6 +291,32 @@ class DbAdapter:
 
         return result
 
+    def gs_count_rows(self, table_name):
+        result = 0
+        try:
+            self.cur.execute(sql.SQL("SELECT count(*) FROM {0}").format(sql.Identifier(table_name)))
+            result = self.cur.fetchone()[0]
+        except (Exception, psycopg2.DatabaseError) as error:
+            logger.error("DB Error: " + str(error))
+
+        return result
+
+    # yield the hashes of all rows in lists of batch_size, from a server side cursor
+    def gs_iterate_hashes(self, table_name):
+        try:
+            with self.conn.cursor(name="gs_iterate_hashes") as cur:
+                cur.itersize = self.batch_size
+                cur.execute(sql.SQL("SELECT hash FROM {0}").format(sql.Identifier(table_name)))
+                while True:
+                    rows = cur.fetchmany(self.batch_size)
+                    if not rows:
+                        break
+                    yield [bytes(row[0]) for row in rows]
+            self.conn.commit()
+        except (Exception, psycopg2.DatabaseError) as error:
+            self.conn.rollback()
+            logger.error("DB Error: " + str(error))
+
     # load only unsolved sets (only unsolved sets have unique_nodes = 0)
     def gs_load_unsolved_sets(self, table_name, num_clauses):
         result = []
@@ -200,6 +332,9 @@ class DbAdapter:
         return result
 
     def gs_get_set_data(self, table_name, set_hash):
+        # a buffered row is written first, the caller gets all of its columns
+        if set_hash in self.pending_rows.get(table_name, {}) or set_hash in self.pending_counts.get(table_name, {}):
+            self.gs_flush_counts(table_name)
         result = None
         try:
             self.cur.execute(sql.SQL("SELECT * FROM {0} WHERE hash = %s").format(sql.Identifier(table_name)), (set_hash, ))
@@ -213,9 +348,12 @@ class DbAdapter:
         return result
 
     def gs_get_children(self, table_name, set_hash):
+        if set_hash in self.pending_rows.get(table_name, {}):
+            row = self.pending_rows[table_name][set_hash]
+            return (row[2], row[3])
         result = (None, None)
         try:
-            self.cur.execute(sql.SQL("SELECT cid1, cid2 FROM {0} WHERE hash = %s").format(sql.Identifier(table_name)), (set_hash, ))
+            self.execute_prepared("gs_get_children", table_name, "SELECT cid1, cid2 FROM {table} WHERE hash = $1", (set_hash, ))
             row = self.cur.fetchone()
             result = (bytes(row['cid1']), bytes(row['cid2']))
 
@@ -224,6 +362,34 @@ class DbAdapter:
 
         return result
 
+    # existence, children and bodies of the children of a list of hashes, in one query. Returns a dict of the hashes
+    # found: their cid1, cid2 and the bodies of both children, None for a child that isn't in the table
+    def gs_get_nodes(self, table_name, hashes):
+        result = {}
+        pending = self.pending_rows.get(table_name, {})
+        try:
+            query_hashes = [hash for hash in hashes if hash not in pending]
+            if query_hashes:
+                self.execute_prepared("gs_get_nodes", table_name, """
+                        SELECT node.hash, node.cid1, node.cid2, child1.body, child2.body FROM {table} node
+                        LEFT JOIN {table} child1 ON child1.hash = node.cid1
+                        LEFT JOIN {table} child2 ON child2.hash = node.cid2
+                        WHERE node.hash = ANY($1)
+                    """, (query_hashes, ))
+                for row in self.cur.fetchall():
+                    result[bytes(row[0])] = (bytes(row[1]) if row[1] is not None else None, bytes(row[2]) if row[2] is not None else None, row[3], row[4])
+
+            # the buffered rows and their children, rarely asked for
+            for hash in hashes:
+                if hash in pending:
+                    children = pending[hash][2:4]
+                    bodies = [pending[child][1] if child in pending else (self.gs_get_set_data(table_name, child) or {}).get('body') for child in children]
+                    result[hash] = tuple(children) + tuple(bodies)
+        except (Exception, psycopg2.DatabaseError) as error:
+            self.conn.rollback()
+            logger.error("DB Error: " + str(error))
+
+        return result
 
     # drop all global db tables
     def gs_drop_all(self):
@@ -281,7 +447,7 @@ class DbAdapter:
         success = False
         try:
             # execute the INSERT statement
-            self.cur.execute(sql.SQL("INSERT INTO {0}(id, body, properties) VALUES(%s, %s, %s)").format(sql.Identifier(table_name)), (id, body, properties))
+            self.execute_prepared("rtq_insert_set", table_name, "INSERT INTO {table}(id, body, properties) VALUES($1, $2, $3)", (id, body, properties))
             success = True
             self.conn.commit()
         except (Exception, psycopg2.DatabaseError) as error:
@@ -299,7 +465,7 @@ class DbAdapter:
 
         result = None
         try:
-            self.cur.execute(sql.SQL("SELECT id, body, properties FROM {0} WHERE id = %s LIMIT 1").format(sql.Identifier(table_name)), (id, ))
+            self.execute_prepared("rtq_get_set", table_name, "SELECT id, body, properties FROM {table} WHERE id = $1 LIMIT 1", (id, ))
             row = self.cur.fetchone()
             result = (bytes(row['id']), row['body'], row['properties'])
         except (Exception, psycopg2.DatabaseError) as error:
@@ -311,6 +477,7 @@ class DbAdapter:
     def rtq_cleanup(self, table_name):
         success = False
         try:
+            self.deallocate_prepared(table_name)
             self.cur.execute(sql.SQL("DROP table {0}").format(sql.Identifier(table_name)))
             self.conn.commit()
             # get result
@@ -0,0 +1,198 @@
+#	DbBackends.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# Storage backends of the global sets table (-gdb) and the runtime queues (-rdb), selected with -dbb:
+#  - postgres: DbAdapter, a PostgreSQL server configured by DB_HOST etc. in configs.py, shared by all machines of a run
+#  - sqlite: SqliteAdapter, an SQLite file of this machine, no server needed
+# Both have the same gs_* and rtq_* methods, plus:
+#   gs_flush()      write the buffered writes
+#   gs_count_rows(), gs_iterate_hashes()    the rows of the global sets table, for its Bloom filter (BloomFilter.py)
+#   gs_get_nodes()  existence, children and bodies of the children of many hashes at once, for -gpf
+#   reconnect()     open a connection of its own in a forked worker
+#   get_counters()  connections opened, and the calls and seconds of the hot queries of this process
+# The backend's module is only imported when it's used, psycopg2 isn't needed for sqlite.
+#
+# The writes to the global sets table are buffered the same way for both backends, in BufferedDbAdapter: the new rows,
+# their counts and their redundant times are kept in memory and written batch_size rows at a time. A backend only has
+# the SQL: it opens its connection (connect(), close()) and writes a batch (write_rows(), write_counts()). A batch that
+# can't be written stays in the buffer for the next flush.
+
+import os
+from abc import ABC, abstractmethod
+from configs import *
+
+# the connections and cursors a forked worker got from its parent. They may share their sockets or files with the
+# connections of the parent, closing one of them could end the session of the parent, so they're kept here and never
+# closed or used. A forked worker exits without cleaning up its objects
+inherited_connections = []
+
+# keep connections and cursors of the parent, see inherited_connections
+def keep_inherited(*objects):
+	inherited_connections.extend(objects)
+
+class BufferedDbAdapter(ABC):
+
+	def __init__(self, batch_size=GDB_BATCH_ROWS):
+		self.batch_size = batch_size
+		# buffered writes of every table: rows by hash, counts by hash, and redundant times by hash
+		self.pending_rows = {}
+		self.pending_counts = {}
+		self.pending_times = {}
+		self.conn = None
+		self.cur = None
+		self.connect()
+
+	# open a connection of this process: sets pid, conn and cur
+	@abstractmethod
+	def connect(self):
+		pass
+
+	# commit and close the connection of this process
+	@abstractmethod
+	def close(self):
+		pass
+
+	# write rows (hash, body, cid1, cid2, mapping, num_of_clauses, num_of_vars) by hash, returns the set of the hashes
+	# inserted, or None on error
+	@abstractmethod
+	def write_rows(self, table_name, rows):
+		pass
+
+	# write counts (hash, unique_nodes, redundant_nodes, redundant_hits) by hash and redundant times by hash, returns
+	# False on error
+	@abstractmethod
+	def write_counts(self, table_name, counts, times):
+		pass
+
+	# the mapping of a row as the backend stores it
+	def encode_mapping(self, mapping):
+		return mapping
+
+	def __del__(self):
+		try:
+			# the connection of a forked worker belongs to its parent
+			if self.conn is not None and self.pid == os.getpid():
+				self.gs_flush()
+				self.close()
+				self.conn = None
+			elif self.conn is not None:
+				keep_inherited(self.conn, self.cur)
+		except Exception as error:
+			logger.error("DB Error: " + str(error))
+
+	# the buffered writes are written before an adapter is sent to another process, without its connection
+	def __getstate__(self):
+		self.gs_flush()
+		state = self.__dict__.copy()
+		state['conn'] = state['cur'] = None
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self.connect()
+
+	# a forked worker opens a connection of its own, the connection and the buffered writes are its parent's
+	def reconnect(self):
+		if self.pid != os.getpid():
+			keep_inherited(self.conn, self.cur)
+			self.pending_rows, self.pending_counts, self.pending_times = {}, {}, {}
+			self.connect()
+
+	def gs_insert_row(self, table_name, hash, set_body, child1_hash, child2_hash, mapping, num_of_clauses, num_of_vars):
+		# returns SUCCESS for a buffered row. DB_UNIQUE_VIOLATION is only returned for the row that fills the buffer,
+		# if it's stored by another process already. A failed batch is kept in the buffer, DB_UNKNOWN_ERROR is returned
+		self.pending_rows.setdefault(table_name, {})[hash] = (hash, set_body, child1_hash, child2_hash, self.encode_mapping(mapping), num_of_clauses, num_of_vars)
+		if len(self.pending_rows[table_name]) < self.batch_size:
+			return SUCCESS
+
+		inserted = self.gs_flush_rows(table_name)
+		if inserted is None:
+			return DB_UNKNOWN_ERROR
+		if hash not in inserted:
+			logger.debug("Node is already found in the global DB")
+			return DB_UNIQUE_VIOLATION
+		return SUCCESS
+
+	# write the buffered rows of the table, returns the set of the hashes inserted, or None on error
+	def gs_flush_rows(self, table_name):
+		rows = self.pending_rows.pop(table_name, {})
+		if not rows:
+			return set()
+
+		inserted = self.write_rows(table_name, rows)
+		if inserted is None:
+			# the batch is kept, it's written with the next flush
+			self.restore_pending(table_name, rows)
+		return inserted
+
+	def gs_update_count(self, table_name, unique_nodes, redundant_nodes, redundant_hits, hash):
+		self.pending_counts.setdefault(table_name, {})[hash] = (hash, unique_nodes, redundant_nodes, redundant_hits)
+		if len(self.pending_counts[table_name]) < self.batch_size:
+			return True
+		return self.gs_flush_counts(table_name)
+
+	def gs_update_redundant_times(self, table_name, redundant_times, hash):
+		times = self.pending_times.setdefault(table_name, {})
+		times[hash] = times.get(hash, 0) + redundant_times
+		if len(times) < self.batch_size:
+			return True
+		return self.gs_flush_counts(table_name)
+
+	# write the buffered counts and redundant times of the table, after its buffered rows
+	def gs_flush_counts(self, table_name):
+		if self.gs_flush_rows(table_name) is None:
+			return False
+
+		counts = self.pending_counts.pop(table_name, {})
+		times = self.pending_times.pop(table_name, {})
+		if not counts and not times:
+			return True
+
+		if not self.write_counts(table_name, counts, times):
+			self.restore_pending(table_name, counts=counts, times=times)
+			return False
+		return True
+
+	# put back the buffered writes of a batch that failed, before the writes buffered since
+	def restore_pending(self, table_name, rows=None, counts=None, times=None):
+		if rows:
+			self.pending_rows[table_name] = {**rows, **self.pending_rows.get(table_name, {})}
+		if counts:
+			self.pending_counts[table_name] = {**counts, **self.pending_counts.get(table_name, {})}
+		if times:
+			pending_times = self.pending_times.setdefault(table_name, {})
+			for hash, redundant_times in times.items():
+				pending_times[hash] = pending_times.get(hash, 0) + redundant_times
+
+	# write all buffered rows, counts and redundant times
+	def gs_flush(self):
+		result = True
+		for table_name in set(self.pending_rows) | set(self.pending_counts) | set(self.pending_times):
+			result &= self.gs_flush_counts(table_name)
+		return result
+
+
+def create_db_adapter(backend=DB_POSTGRES, db_file=DB_FILE, batch_size=GDB_BATCH_ROWS):
+	if backend == DB_SQLITE:
+		from SqliteAdaptor import SqliteAdapter
+		return SqliteAdapter(db_file, batch_size)
+	from DbAdaptor import DbAdapter
+	return DbAdapter(batch_size)
@@ -0,0 +1,161 @@
+#	Executors.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# Backends that run the tasks of the worker pool:
+#  - ray: actors of a Ray cluster, see WorkerPool.py. Ray is only imported and initialized when this backend is chosen.
+#  - local: processes of this machine in a ProcessPoolExecutor, forked where possible so they start fast.
+# Both pools have the same interface, and the workers of both keep their PatternSolver between tasks.
+
+import os
+import sys
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from configs import *
+
+LOCAL_CONTEXT = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+
+# solver of a worker process of the local backend
+local_pattern_solver = None
+
+
+# the Ray backend is used if a cluster address is given, or an option needs it
+def select_backend(backend, ray_address=None, needs_ray=False):
+	if backend != BACKEND_AUTO:
+		return backend
+	if ray_address or os.environ.get("RAY_ADDRESS") or needs_ray:
+		return BACKEND_RAY
+	return BACKEND_LOCAL
+
+# returns the resources of the cluster
+def init_ray(ray_address=None):
+	import ray
+	if not ray.is_initialized():
+		current_dir = os.path.dirname(os.path.abspath(__file__))
+		# Set Ray's logging level to only show errors
+		ray.init(address=ray_address, runtime_env={"working_dir": current_dir}, logging_level=logging.ERROR)
+	return ray.cluster_resources()
+
+def get_cpu_count():
+	ray = sys.modules.get("ray")
+	if ray is not None and ray.is_initialized():
+		return int(ray.cluster_resources().get("CPU", 1))  # Convert to int, defaults to 1 if not available
+	return int(os.cpu_count() or 1)  # Defaults to 1 if os.cpu_count() returns None
+
+def create_pool(backend, pattern_solver, size):
+	if backend == BACKEND_RAY:
+		from WorkerPool import WorkerPool
+		return WorkerPool(pattern_solver, size)
+	return LocalWorkerPool(pattern_solver, size)
+
+def create_cancel_flag(backend):
+	if backend == BACKEND_RAY:
+		from CancelFlag import CancelFlag
+		return CancelFlag()
+	return LocalCancelFlag(LOCAL_CONTEXT)
+
+
+def init_local_worker(pattern_solver):
+	global local_pattern_solver
+	local_pattern_solver = pattern_solver
+	local_pattern_solver.set_node_options()
+	# the DB connection of the main process isn't shared with the forked workers
+	if local_pattern_solver.db_adaptor:
+		local_pattern_solver.db_adaptor.reconnect()
+
+# call a method of the solver of the process, returns its result and the time it took
+def run_local_task(method, args, kwargs):
+	start_time = time.perf_counter()
+	result = getattr(local_pattern_solver, method)(*args, **kwargs)
+	return result, time.perf_counter() - start_time
+
+
+class LocalWorkerPool:
+
+	def __init__(self, pattern_solver, size):
+		start_time = time.perf_counter()
+		self.workers = size
+		self.executor = ProcessPoolExecutor(max_workers=size, mp_context=LOCAL_CONTEXT, initializer=init_local_worker, initargs=(pattern_solver,))
+		# processes are started on demand, start all of them now
+		wait([self.executor.submit(os.getpid) for _ in range(size)])
+		self.startup_time = time.perf_counter() - start_time
+
+		self.running = set()    # futures of the running tasks
+		self.compute_time = 0
+		self.tasks = 0
+
+	def size(self):
+		return self.workers
+
+	def idle_count(self):
+		return self.workers - len(self.running)
+
+	def pending_count(self):
+		return len(self.running)
+
+	# the processes get a copy of every argument anyway
+	def put(self, value):
+		return value
+
+	# run a method of the solver on an idle worker, returns the future of the task
+	def submit(self, method, *args, **kwargs):
+		task = self.executor.submit(run_local_task, method, args, kwargs)
+		self.running.add(task)
+		return task
+
+	# wait for the next task to finish, returns its result, or None if no task finished within the timeout
+	def get_next(self, timeout=None):
+		return self.get_next_task(timeout)[1]
+
+	# wait for the next task to finish, returns its future and its result
+	def get_next_task(self, timeout=None):
+		done, _ = wait(self.running, timeout=timeout, return_when=FIRST_COMPLETED)
+		if not done:
+			return None, None
+		task = done.pop()
+		self.running.remove(task)
+		result, compute_time = task.result()
+		self.compute_time += compute_time
+		self.tasks += 1
+		return task, result
+
+	def shutdown(self):
+		self.executor.shutdown(cancel_futures=True)
+		self.running = set()
+
+
+# cancel flag of the local backend in shared memory, the worker processes get it when they start, it can't be sent with a task
+class LocalCancelFlag:
+
+	def __init__(self, context):
+		self.set_time = context.Value('d', 0)
+
+	def set(self):
+		with self.set_time.get_lock():
+			if not self.set_time.value:
+				self.set_time.value = time.time()
+
+	def get_time(self):
+		return self.set_time.value or None
+
+	def shutdown(self):
+		pass
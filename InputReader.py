@@ -152,6 +152,7 @@ class InputReader:
     def get_cnf_set(self):
         
         # input set has to be all in one line
+        seq = self.input
         if self.input_type == INPUT_SLF:          
             seq = self.input.readline()
             self.input.close()
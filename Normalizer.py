@@ -0,0 +1,159 @@
+#	Normalizer.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# Normalizer brings clauses to L.O. condition (see Set.is_in_lo_state()), giving the same result of the loop
+# rename_vars() -> is_in_lo_state() -> sort_clauses() in Set.to_lo_condition_iterative(), with less work per round:
+#
+# - A literal is encoded as 2 * var + 1 if negated, 2 * var otherwise (Clause.encode_literals()). Sorting the literals of
+#   a clause by absolute value is then sorting the encoded literals, and a clause as a tuple of encoded literals is its
+#   own sort key, computed once per clause: tuples compare exactly like Clause.__lt__ (by absolute value, +5 before -5,
+#   and the shorter clause first if it's a prefix of the other). So all sorts run on plain tuples without a python
+#   comparator. tools/check_clause_order.py checks this order against Clause.__lt__ on the clauses sorted here.
+# - After a rename round the variables are named in the order they appear, so conditions 3 and 5 always hold and only
+#   condition 2 (clauses sorted by their first variable) has to be checked.
+# - After sorting the clauses, conditions 3 and 5 hold only if the next rename round would keep every name. This is
+#   checked with one scan over the literals, and the rename round is only done if needed.
+# - A rename round maps the encoded literals through a lookup list, so the work per literal runs in C (map, Counter, sorted).
+#
+# The number of rename rounds is returned, it equals the iterations of the old loop.
+#
+# The rounds are NOT bounded: like the old loop, the engine renames and sorts until the clauses are in L.O. condition.
+# This is deliberate, a bounded number of passes would stop some nodes before their canonical form, so equal sets could
+# get different hashes, and redundant nodes and the rows of the global sets table would be missed. On the first 100
+# nodes of FACT32-8bit, FACT131-11bit, FACT1301-16bit, Multi8bit and Multi11bit (mode flo, see tools/bench_lo_condition.py)
+# a node takes 4.4 to 6.3 rounds on average and up to 10. What the engine saves is the work per round, not rounds.
+# The pivot of the node (see configs.py for the strategies) is chosen from the clauses in their final state, reusing the
+# literal counts of the last rename round.
+
+from collections import Counter, defaultdict
+from itertools import chain, count, repeat
+from operator import eq, le, itemgetter, rshift
+from configs import *
+from Clause import Clause
+
+class Normalizer:
+
+    def __init__(self, mode=MODE_LO, sort_by_size=False, thief_method=False, pivot_method=PIVOT_LEFTMOST):
+        self.mode = mode
+        self.sort_by_size = sort_by_size
+        self.thief_method = thief_method
+        self.pivot_method = pivot_method
+
+    # a clause as the sorted tuple of its encoded literals (see Clause.encode_literals())
+    @staticmethod
+    def encode(raw):
+        return tuple(sorted(Clause.encode_literals(raw)))
+
+    @staticmethod
+    def decode(clause):
+        return [-(e >> 1) if e & 1 else e >> 1 for e in clause]
+
+    # rename variables in the order they appear, returns the renamed clauses (sorted within), the previous name of every
+    # new variable, the highest occurring literal as Set.rename_vars() counts it, and the count of every encoded literal
+    @staticmethod
+    def rename(clauses):
+        literals = list(chain.from_iterable(clauses))
+        var_positions = list(dict.fromkeys(map(rshift, literals, repeat(1))))
+
+        # new name of every encoded literal
+        names = [0] * ((max(var_positions) + 1) << 1)
+        for n, v in enumerate(var_positions, 1):
+            names[v << 1] = n << 1
+            names[(v << 1) | 1] = (n << 1) | 1
+        rename_literal = names.__getitem__
+
+        # count before sorting within clauses, so ties are broken as in Set.rename_vars()
+        counts = Counter(map(rename_literal, literals))
+        highest = max(counts, key=counts.get)
+        highest_occurring_var = -(highest >> 1) if highest & 1 else highest >> 1
+
+        return [tuple(sorted(map(rename_literal, clause))) for clause in clauses], var_positions, highest_occurring_var, counts
+
+    # condition 2: clauses are sorted by their first variable
+    @staticmethod
+    def is_sorted(clauses):
+        firsts = list(map(rshift, map(itemgetter(0), clauses), repeat(1)))
+        return all(map(le, firsts, firsts[1:]))
+
+    # conditions 3 and 5: variables 1, 2, 3 ... appear for the first time in this order
+    @staticmethod
+    def keeps_names(clauses):
+        var_positions = dict.fromkeys(map(rshift, chain.from_iterable(clauses), repeat(1)))
+        return all(map(eq, var_positions, count(1)))
+
+    # the variable to branch on, counts: the count of every encoded literal if it's already known.
+    # Ties are broken by the lowest variable, so the pivot only depends on the clauses
+    def choose_pivot(self, clauses, counts=None):
+        if self.pivot_method == PIVOT_MOST_OCCURRING:
+            if counts == None:
+                counts = Counter(chain.from_iterable(clauses))
+            return max(counts.items(), key=lambda item: (item[1], -item[0]))[0] >> 1
+
+        if self.pivot_method == PIVOT_SHORTEST_CLAUSE:
+            return min(clauses, key=len)[0] >> 1
+
+        if self.pivot_method == PIVOT_JEROSLOW_WANG:
+            scores = defaultdict(float)
+            for clause in clauses:
+                weight = 2.0 ** -len(clause)
+                for e in clause:
+                    scores[e >> 1] += weight
+            return max(scores.items(), key=lambda item: (item[1], -item[0]))[0]
+
+        return clauses[0][0] >> 1
+
+    # clauses: list of encoded clauses, initial_indices: parallel list of the initial index of every clause
+    # returns (order, clauses, final_names_map, highest_occurring_var, rounds, pivot), order[i] is the position in the input of the i-th output clause
+    def normalize(self, clauses, initial_indices, final_names_map):
+        order = list(range(len(clauses)))
+
+        def reorder(positions):
+            nonlocal clauses, order
+            clauses = [clauses[i] for i in positions]
+            order = [order[i] for i in positions]
+
+        # used in Thief method, sort by length,initial index
+        if self.thief_method:
+            reorder(sorted(range(len(clauses)), key=lambda i: (len(clauses[i]), initial_indices[i])))
+
+        if self.mode == MODE_FLOP or self.sort_by_size:
+            reorder(sorted(range(len(clauses)), key=lambda i: len(clauses[i])))
+
+        sort_clauses = self.mode != MODE_LOU and self.mode != MODE_NORMAL
+        rounds = 0
+        while True:
+            clauses, var_positions, highest_occurring_var, counts = Normalizer.rename(clauses)
+            rounds += 1
+
+            # if the set already gone through a round of rename before
+            if final_names_map:
+                final_names_map = [final_names_map[v-1] for v in var_positions]
+            else:
+                final_names_map = var_positions
+
+            if not sort_clauses or Normalizer.is_sorted(clauses):
+                break
+
+            reorder(sorted(range(len(clauses)), key=clauses.__getitem__))
+            if Normalizer.keeps_names(clauses):
+                break
+
+        return order, clauses, final_names_map, highest_occurring_var, rounds, self.choose_pivot(clauses, counts)
@@ -23,19 +23,17 @@ import os, gc
 import sys
 import time, math
 from datetime import datetime, timezone
-import psutil
 import binascii
 from collections import defaultdict
-from graphviz import Digraph
 from queue import Queue
 from configs import *
-from DbAdaptor import DbAdapter
+# ray, psycopg2, graphviz and psutil take long to import, they're imported where the options need them
 import SuperQueue
 from Set import Set
+from CompactSet import CompactSet
+import Executors
 import traceback
-import psycopg2
 import math
-import ray
 
 
 # TODO:
@@ -63,17 +61,6 @@ import ray
 #  - enable multiple Ray Clusters
 #  - enable GPU
 
-TRUE_SET_HASH = Set.calculate_hash('T')
-FALSE_SET_HASH = Set.calculate_hash('F')
-
-
-# Declare a global variable for CPU count
-CPU_COUNT = None
-
-# Get the number of CPUs from the Ray cluster
-cluster_resources = ray.cluster_resources()
-CPU_COUNT = cluster_resources.get("CPU", 1)  # Defaults to 1 if not available
-
 # An object represent a node in the graph
 class Node:
 
@@ -90,19 +77,9 @@ class Node:
 		# if a parent node found two children with the flag set to True, it means it has a redundant node in its subgraph
 		self.has_potential_redundant = False
 
-@ray.remote
-class RemotePatternSolver():
-	def __init__(self, pattern_solver, name='', node=None):
-		self.pattern_solver = pattern_solver
-		self.name = name
-		self.node = node
-
-	def do_get_node_subgraph_stats(self, root_id, node_ids, nodes_children):
-		return self.pattern_solver.do_get_node_subgraph_stats(root_id, node_ids, nodes_children)
-
-	def process_nodes_queue(self, input_mode=None, dot=None, sort_by_size=False, thief_method=False, break_on_squeue_size=0):
-		return (self,) + self.pattern_solver.process_nodes_queue(self.node, input_mode, dot, generate_threads=False, name=self.name, is_sub_process=True, sort_by_size=sort_by_size, thief_method=thief_method, break_on_squeue_size=break_on_squeue_size)
-
+# counters of the nodes processed by pool workers, they're summed up in the main process
+WORKER_COUNTERS = ['propagated_nodes', 'forced_vars', 'decomposed_nodes', 'components', 'component_cache_hits', 'unsat_hits', 'seen_set_skips',
+	'bloom_checks', 'bloom_positives', 'bloom_false_positives']
 
 class PatternSolverArgs:
 	def __init__(self, args=None):
@@ -114,6 +91,12 @@ class PatternSolverArgs:
 		self.threads = args.threads if args else 0
 		self.use_global_db = args.use_global_db if args else False
 		self.use_runtime_db = args.use_runtime_db if args else False
+		self.gdb_no_mem = args.gdb_no_mem if args else False
+		self.gdb_batch = args.gdb_batch if args else GDB_BATCH_ROWS
+		self.gdb_bloom = args.gdb_bloom if args else False
+		self.gdb_prefetch = args.gdb_prefetch if args else 0
+		self.db_backend = args.db_backend if args else DB_POSTGRES
+		self.db_file = args.db_file if args else DB_FILE
 		self.output_graph_file = args.output_graph_file if args else None
 		self.output_solution_file = args.output_solution_file if args else None
 		self.verbos = args.verbos if args else False
@@ -121,6 +104,18 @@ class PatternSolverArgs:
 		self.very_verbos = args.very_verbos if args else False
 		self.sort_by_size = args.sort_by_size if args else False
 		self.thief_method = args.thief_method if args else None
+		self.compact_sets = args.compact_sets if args else False
+		self.hash_method = args.hash_method if args else None
+		self.occurrence_index = args.occurrence_index if args else False
+		self.propagate = args.propagate if args else None
+		self.decompose = args.decompose if args else False
+		self.pivot_method = args.pivot_method if args else None
+		self.backend = args.backend if args else BACKEND_LOCAL
+		self.seen_set = args.seen_set if args else 0
+		self.work_stealing = args.work_stealing if args else False
+		self.engine = args.engine if args else ENGINE_QUEUE
+		self.stream_results = args.stream_results if args else False
+		self.stats = args.stats if args else STATS_DAG
 
 
 class PatternSolver:
@@ -149,27 +144,48 @@ class PatternSolver:
 			self.use_runtime_db = True
 
 		if args.use_runtime_db or args.use_global_db:
-			self.db_adaptor = DbAdapter()
+			import DbBackends
+			self.db_adaptor = DbBackends.create_db_adapter(args.db_backend, args.db_file, args.gdb_batch)
 
 		if args.mode:
 			self.global_table_name = GLOBAL_SETS_TABLE_PREFIX + args.mode.lower()
 
+		self.set_node_options()
+
 		self.seen_sets.clear()
 		self.reset()
 		
 		self.max_threads = self.get_cpu_count(args.threads)
 		
-		self.cluster_resources = cluster_resources if cluster_resources else ray.cluster_resources()
+		self.cluster_resources = cluster_resources
+
+		# pool of worker actors, created on first use and shut down at the end of solve_set()
+		self.worker_pool = None
+		# ids of the nodes taken by the workers, shared by all workers of the pool
+		self.seen_set = None
+		# queue of the subgraphs and solutions the workers stream to the main process while they run
+		self.result_stream = None
+		# set by the first worker that finds a solution, when solving should stop then
+		self.cancel_flag = None
+		# Bloom filter of the hashes of the global sets table with -gbf, see BloomFilter.py
+		self.gdb_filter = None
+		# the next nodes of the queue looked up in the global DB at once with -gpf: their children and the bodies of their
+		# children, or None if they're not in the DB
+		self.gdb_prefetched = {}
 		
+	# hash method, occurrences index and pivot strategy are class attributes of Set, so they have to be set in every process
+	# that handles nodes, i.e. here and again in remote processes, which get a copy of this object but not of the class
+	def set_node_options(self):
+		if self.args.hash_method:
+			Set.hash_method = self.args.hash_method
+		if self.args.pivot_method:
+			Set.pivot_method = self.args.pivot_method
+		Set.use_occurrences = bool(self.args.occurrence_index)
+
 	def get_cpu_count(self, thread_arg):
 		if thread_arg == 0:
-			if ray.is_initialized():
-				# Get the number of available CPU cores from Ray
-				cluster_resources = ray.cluster_resources()
-				return int(cluster_resources.get("CPU", 1))  # Convert to int, defaults to 1 if not available
-			else:
-				# Ray is not initialized, use system's CPU count
-				return int(os.cpu_count() or 1)  # Defaults to 1 if os.cpu_count() returns None
+			# CPUs of the Ray cluster, or of this machine
+			return Executors.get_cpu_count()
 		elif thread_arg > 1:
 			return int(thread_arg)
 		else:
@@ -178,19 +194,88 @@ class PatternSolver:
 	def reset(self):
 		self.is_satisfiable = False
 		self.leaves = []
-		# populate nodes_stats with defaults
-		self.nodes_stats = defaultdict(lambda: [0,0,0])
+		# the finished graph as a CsrGraph, and the unique nodes, redundant nodes and redundant hits of every node of it
+		self.graph = None
+		self.nodes_stats = None
 
 		# vars to calculate graph size at the end
 		self.uniques = self.redundant_hits = self.redundants = self.nodes_found_in_gdb = 0
+		# propagation stats: nodes with forced variables, and the number of forced variables
+		self.propagated_nodes = self.forced_vars = 0
+		# decomposition stats, and solved components by hash: the solution in the component's own variables, or None if
+		# it's not satisfiable. unsat_nodes has the hashes of nodes found not satisfiable while solving components
+		self.decomposed_nodes = self.components = self.component_cache_hits = self.unsat_hits = 0
+		self.component_solutions = {}
+		self.unsat_nodes = set()
+		self.expanded_nodes = 0
 		self.redundant_ids = {}  # ids of redundant nodes
 		self.nodes_children = {} # children ids for every node
+		# ids of the nodes a pool worker has already expanded in its previous tasks, their subgraphs are already sent
+		# to the main process, so they are redundant in the next tasks of this worker
+		self.known_nodes = set()
+		# nodes a worker didn't expand because another worker took them first
+		self.seen_set_skips = 0
+		self.seen_set_stats = None
+		# gdb lookups with -gbf: hashes checked, hashes the filter may have, and those not found in the DB then
+		self.bloom_checks = self.bloom_positives = self.bloom_false_positives = 0
+		# work stealing stats per worker: busy time, idle time, nodes and steals
+		self.worker_times = {}
+		# level engine stats per level: nodes expanded, unique children, redundant hits and evaluated children
+		self.levels = []
+		# streamed results: deltas and their nodes merged by the main process, and the first streamed solution
+		self.stream_deltas = self.streamed_nodes = 0
+		self.streamed_solution = None
+		# a worker is cancelled when it sees the cancel flag. The time from the first solution until all workers stopped
+		self.cancelled = False
+		self.cancel_latency = None
+
+		# worker pool stats: workers, their start-up time, the time spent in tasks, and the number of tasks
+		self.pool_workers = self.pool_tasks = 0
+		self.pool_startup_time = self.pool_compute_time = 0
+		# DB counters of the workers: connections opened, and the calls and seconds of the prepared statements
+		self.db_counters = {}
 
 		self.started_processes = 0
 		self.threads_count = 0
 		self.start_creating_threads = False
 		self.threads = []
 
+	def get_worker_pool(self):
+		if self.worker_pool is None:
+			pattern_solver = PatternSolver(args=PatternSolverArgs(self.args))
+			pattern_solver.seen_set = self.seen_set
+			pattern_solver.result_stream = self.result_stream
+			pattern_solver.cancel_flag = self.cancel_flag
+			pattern_solver.gdb_filter = self.gdb_filter
+			self.worker_pool = Executors.create_pool(self.args.backend, pattern_solver, self.max_threads)
+			if self.args.verbos:
+				logger.info(f"Started {self.worker_pool.size()} workers in {self.worker_pool.startup_time:.2f} seconds")
+		return self.worker_pool
+
+	def shutdown_worker_pool(self):
+		if self.worker_pool is not None:
+			self.pool_workers = max(self.pool_workers, self.worker_pool.size())
+			self.pool_startup_time += self.worker_pool.startup_time
+			self.pool_compute_time += self.worker_pool.compute_time
+			self.pool_tasks += self.worker_pool.tasks
+			self.worker_pool.shutdown()
+			self.worker_pool = None
+
+	# counters a worker sends to the main process after every task, as the change during the task
+	def get_counters(self, since=None):
+		counters = {counter: getattr(self, counter) - (since[counter] if since else 0) for counter in WORKER_COUNTERS}
+		if self.db_adaptor:
+			counters['db_counters'] = {counter: value - (since['db_counters'].get(counter, 0) if since else 0) for counter, value in self.db_adaptor.get_counters().items()}
+		return counters
+
+	def add_counters(self, counters):
+		for counter, value in counters.items():
+			if counter == 'db_counters':
+				for db_counter, db_value in value.items():
+					self.db_counters[db_counter] = self.db_counters.get(db_counter, 0) + db_value
+			else:
+				setattr(self, counter, getattr(self, counter) + value)
+
 	def draw_graph(self, dot, outputfile):
 		fg = open(outputfile, "w")
 		fg.write(dot.source)
@@ -206,28 +291,76 @@ class PatternSolver:
 			# combine solved and unsolved in seen_sets map
 			self.seen_sets.update({el:1 for el in self.solved_sets.keys()})
 
+	# the Bloom filter is kept next to the database: the sqlite file, or the working directory for a PostgreSQL server
+	def get_gdb_filter_file(self):
+		db_name = self.args.db_file if self.args.db_backend == DB_SQLITE else f"{DB_HOST}_{DB_NAME}"
+		return f"{db_name}.{self.global_table_name}.bloom"
+
+	def load_gdb_filter(self):
+		import BloomFilter
+		load_time = time.perf_counter()
+		self.gdb_filter, rows = BloomFilter.load_gdb_filter(self.db_adaptor, self.global_table_name, self.get_gdb_filter_file())
+		if self.args.verbos:
+			logger.info(f"Bloom filter of {rows:,} rows of the global DB ({sizeof_fmt(self.gdb_filter.size_in_bytes())}) loaded in {time.perf_counter() - load_time:.2f} seconds")
+
+	# the nodes of this run are added to the Bloom filter, it's saved with the rows of the table then, so the next run
+	# loads it as is. The filter holds all rows of the table then, its items are the rows
+	def save_gdb_filter(self):
+		self.db_adaptor.gs_flush()
+		if self.graph is not None:
+			self.gdb_filter.add_block(self.graph.hashes, self.graph.hash_size)
+		elif self.nodes_children:
+			self.gdb_filter.add_block(b''.join(self.nodes_children), len(next(iter(self.nodes_children))))
+		rows = self.db_adaptor.gs_count_rows(self.global_table_name)
+		self.gdb_filter.items = rows
+		self.gdb_filter.save(self.get_gdb_filter_file(), rows)
+
+	# look up the next nodes of the queue in the global DB in one query: whether they're in it, their children and the
+	# bodies of their children. Only the hashes the Bloom filter or the loaded hashes may have are sent
+	def prefetch_gdb(self, squeue, db_adaptor):
+		hashes = squeue.peek_ids(self.args.gdb_prefetch)
+		self.gdb_prefetched = dict.fromkeys(hashes)
+		if self.gdb_filter is not None:
+			self.bloom_checks += len(hashes)
+			hashes = [set_hash for set_hash in hashes if set_hash in self.gdb_filter]
+			self.bloom_positives += len(hashes)
+		elif not self.args.gdb_no_mem:
+			hashes = [set_hash for set_hash in hashes if self.seen_sets.get(set_hash, False)]
+
+		if hashes:
+			found = db_adaptor.gs_get_nodes(self.global_table_name, hashes)
+			self.gdb_prefetched.update(found)
+			if self.gdb_filter is not None:
+				self.bloom_false_positives += len(hashes) - len(found)
+
 	def get_children_from_gdb(self, set_hash, db_adaptor=None):
 		if db_adaptor == None:
 			db_adaptor = self.db_adaptor
 
 		result = ()
-		children = db_adaptor.gs_get_children(self.global_table_name, set_hash)
-		for child_hash in children:
+		# the children of a prefetched node come with their bodies
+		prefetched = self.gdb_prefetched.get(set_hash)
+		children = prefetched[:2] if prefetched else db_adaptor.gs_get_children(self.global_table_name, set_hash)
+		for index, child_hash in enumerate(children):
 			if child_hash == None:
 				return (None, None)
 
 			child = Set()
-			if child_hash == TRUE_SET_HASH:
+			if child_hash == Set.get_true_set_hash():
 				child.value = True
-			elif child_hash == FALSE_SET_HASH:
+			elif child_hash == Set.get_false_set_hash():
 				child.value = False
 			else:
 				# get the body from the db
-				set_data = db_adaptor.gs_get_set_data(self.global_table_name, child_hash)
-				if set_data == None:
+				if prefetched:
+					body = prefetched[2 + index]
+				else:
+					set_data = db_adaptor.gs_get_set_data(self.global_table_name, child_hash)
+					body = set_data['body'] if set_data != None else None
+				if body == None:
 					return (None, None)
 
-				child = Set(set_data['body'])
+				child = Set(body)
 				child.computed_hash = child_hash
 
 			result = result + (child, )
@@ -240,6 +373,19 @@ class PatternSolver:
 	def is_set_in_gdb(self, set_hash, db_adaptor=None):
 		if db_adaptor == None:
 			db_adaptor = self.db_adaptor
+		# a prefetched node is known to be in the DB or not, until it's saved (see save_parent_children())
+		if set_hash in self.gdb_prefetched:
+			return self.gdb_prefetched[set_hash] is not None
+		# only the hashes the Bloom filter may have are looked up in the DB
+		if self.gdb_filter is not None:
+			self.bloom_checks += 1
+			if set_hash not in self.gdb_filter:
+				return False
+			self.bloom_positives += 1
+			found = db_adaptor.gs_does_hash_exist(self.global_table_name, set_hash)
+			if not found:
+				self.bloom_false_positives += 1
+			return found
 		if self.args.gdb_no_mem:
 			return db_adaptor.gs_does_hash_exist(self.global_table_name, set_hash)
 		return self.seen_sets.get(set_hash, False)
@@ -247,6 +393,8 @@ class PatternSolver:
 	def is_set_solved(self, set_hash, db_adaptor=None):
 		if db_adaptor == None:
 			db_adaptor = self.db_adaptor
+		if self.gdb_filter is not None:
+			return set_hash in self.gdb_filter and db_adaptor.gs_is_hash_solved(self.global_table_name, set_hash)
 		if self.args.gdb_no_mem:
 			return db_adaptor.gs_is_hash_solved(self.global_table_name, set_hash)
 		return self.solved_sets.get(set_hash, False)
@@ -263,50 +411,121 @@ class PatternSolver:
 
 		cnf_hash = cnf_set.get_hash()
 		num_of_vars = 0
-		if len(cnf_set.clauses):
+		if cnf_set.clauses_count():
 			num_of_vars = abs(cnf_set.clauses[-1].raw[-1])
 
 		# save the set in global DB if it's not there already
 		if self.args.use_global_db and not self.is_set_in_gdb(cnf_hash, db_adaptor):
+			# the node is in the DB from now on, it isn't prefetched as absent anymore
+			self.gdb_prefetched.pop(cnf_hash, None)
+			if self.gdb_filter is not None:
+				self.gdb_filter.add(cnf_hash)
 			return db_adaptor.gs_insert_row(self.global_table_name,
 										 cnf_hash,              # set hash
 										 cnf_set.to_string(pretty=False),   # set body
 										 child1_hash,           # child 1 hash
 										 child2_hash,           # child 2 hash
 										 [],                    # mapping, to be added
-										 len(cnf_set.clauses),  # count of clauses
+										 cnf_set.clauses_count(),  # count of clauses
 										 num_of_vars)
 
 		return SUCCESS
 
-	def get_node_subgraph_stats(self, node_id, nodes_children, node_descendants, node_redundants):
+	# search a solution of a component with a depth first search, without building its graph. Returns the evaluated_vars
+	# of the first True leaf, or None if it's not satisfiable
+	def solve_component(self, cnf_set, mode, sort_by_size=False, thief_method=False):
+		stack = [cnf_set]
+		visited = set()
+		while stack:
+			for child in stack.pop().evaluate():
+				if self.args.propagate:
+					child.propagate(self.args.propagate == PROPAGATE_PURE)
+
+				if child.value == True:
+					return child.evaluated_vars
+				if child.value == False:
+					continue
+
+				child.to_lo_condition(mode, sort_by_size, thief_method)
+				child_hash = child.get_hash(force_recalculate=True)
+				if child_hash in self.unsat_nodes:
+					self.unsat_hits += 1
+				elif child_hash not in visited:
+					visited.add(child_hash)
+					stack.append(child)
+
+		# all the nodes of the search are not satisfiable
+		self.unsat_nodes.update(visited)
+		return None
+
+	# if the node splits into variable-disjoint components, solve every component on its own and give the node the value
+	# of all of them. Components are cached by their hash, so identical components (up to the names of the variables)
+	# are only solved once. Returns True if the node is decomposed
+	def decompose_node(self, cnf_set, mode, sort_by_size=False, thief_method=False):
+		components = cnf_set.split_components()
+		if len(components) < 2:
+			return False
+
+		self.decomposed_nodes += 1
+		self.components += len(components)
+		for component in components:
+			component.to_lo_condition(mode, sort_by_size, thief_method)
+			component_hash = component.get_hash(force_recalculate=True)
+
+			if component_hash in self.component_solutions:
+				self.component_cache_hits += 1
+			else:
+				# solve a copy of the component in its own variables, so the solution can be shared with the same component
+				# of other nodes
+				num_vars = len(component.final_names_map)
+				own_set = type(component)()
+				own_set.clauses = component.clauses
+				own_set.final_names_map = list(range(1, num_vars + 1))
+				own_set.original_values = {v:v for v in own_set.final_names_map}
+				self.component_solutions[component_hash] = self.solve_component(own_set, mode, sort_by_size, thief_method)
+
+			solution = self.component_solutions[component_hash]
+			if solution == None:
+				cnf_set.set_value(False)
+				return True
+
+			cnf_set.evaluated_vars.update({component.original_values[component.final_names_map[v-1]]:value for v, value in solution.items()})
+
+		cnf_set.set_value(True)
+		return True
+
+	def get_node_subgraph_stats(self, node, offsets, children, node_descendants, node_redundants):
 
-		if node_descendants.get(node_id, False):
-			node_redundants[node_id] += 1
+		if node in node_descendants:
+			node_redundants[node] += 1
 			return
 		else:
-			node_descendants[node_id] = 1
+			node_descendants.add(node)
 
-		for child_id in nodes_children[node_id]:
-			self.get_node_subgraph_stats(child_id, nodes_children, node_descendants, node_redundants)
+		for child in children[offsets[node]:offsets[node + 1]]:
+			self.get_node_subgraph_stats(child, offsets, children, node_descendants, node_redundants)
 
 
-	def do_get_node_subgraph_stats(self, root_id, node_ids, nodes_children):
+	# stats of the nodes first_node to last_node - 1 of the CsrGraph, node 0 is the root
+	def do_get_node_subgraph_stats(self, first_node, last_node, graph):
 
 		result = []
+		offsets, children = graph.to_lists()
 
-		for node_id in node_ids:
-			node_descendants = {}
+		for node in range(first_node, last_node):
+			node_descendants = set()
 			node_redundants = defaultdict(int)
-			self.get_node_subgraph_stats(node_id, nodes_children, node_descendants, node_redundants)
-			result.append( (node_id, len(node_descendants), len(node_redundants), sum(node_redundants.values()), (node_redundants if node_id == root_id else None)) )
+			self.get_node_subgraph_stats(node, offsets, children, node_descendants, node_redundants)
+			result.append( (node, len(node_descendants), len(node_redundants), sum(node_redundants.values()), (node_redundants if node == 0 else None)) )
 
 		return result
 
 
-	def construct_graph_stats(self, root_id, nodes_children, max_threads):
+	def construct_graph_stats(self, graph, max_threads):
+		import numpy as np
 
 		root_node_redundants = {}
+		self.nodes_stats = np.zeros((graph.size(), 3), dtype=np.int64)
 
 		# Retrieve the number of CPUs from the Ray cluster
 		cpu_count = self.get_cpu_count(self.args.threads)
@@ -314,50 +533,36 @@ class PatternSolver:
 		#max_stats = 1 if max_threads < 2 else max_threads if max_threads < 12 else 12
 		split_count = 100000
 
-		keys = []
-		subkeys = []
-
-		for node_id in self.nodes_children.keys():
-			subkeys.append(node_id)
-			if len(subkeys) >= split_count:
-				keys.append(subkeys)
-				subkeys = []
-
-		if len(subkeys):
-			keys.append(subkeys)
+		# ranges of node ids
+		keys = [(first_node, min(first_node + split_count, graph.size())) for first_node in range(0, graph.size(), split_count)]
 
 		if self.args.verbos:
 			print("Generating stats within ", len(keys), " processes each per ", split_count, "IDs ...")
 
-		threads = []
 		finished_stats = 0
 
-		while len(keys) and (len(threads) < max_threads):
-			rps = RemotePatternSolver.remote(PatternSolver(args=PatternSolverArgs()))
-			threads.append(rps.do_get_node_subgraph_stats.remote(root_id, keys.pop(0), nodes_children))
+		# the graph is put in the object store once, and shared by all tasks
+		pool = self.get_worker_pool()
+		graph_ref = pool.put(graph)
 
-		while len(threads):
-			done_id, threads = ray.wait(threads)
-			results = ray.get(done_id[0])
+		while len(keys) and pool.idle_count():
+			pool.submit('do_get_node_subgraph_stats', *keys.pop(0), graph_ref)
 
-			for result in results:
-				node_id, len_node_descendants, len_node_redundants, sum_node_redundants_values, res_root_node_redundants = result
+		while pool.pending_count():
+			results = pool.get_next()
 
-				if not self.nodes_stats[node_id]:
-					self.nodes_stats[node_id][UNIQUE_COUNT]     = 0
-					self.nodes_stats[node_id][REDUNDANT_COUNT]  = 0
-					self.nodes_stats[node_id][REDUNDANT_HITS]   = 0
+			for result in results:
+				node, len_node_descendants, len_node_redundants, sum_node_redundants_values, res_root_node_redundants = result
 
-				self.nodes_stats[node_id][UNIQUE_COUNT]     += len_node_descendants
-				self.nodes_stats[node_id][REDUNDANT_COUNT]  += len_node_redundants
-				self.nodes_stats[node_id][REDUNDANT_HITS]   += sum_node_redundants_values
+				self.nodes_stats[node][UNIQUE_COUNT]     += len_node_descendants
+				self.nodes_stats[node][REDUNDANT_COUNT]  += len_node_redundants
+				self.nodes_stats[node][REDUNDANT_HITS]   += sum_node_redundants_values
 
 				if res_root_node_redundants is not None:
 					root_node_redundants = res_root_node_redundants
 
-			while len(keys) and (len(threads) < max_threads):
-				rps = RemotePatternSolver.remote(PatternSolver(args=PatternSolverArgs()))
-				threads.append(rps.do_get_node_subgraph_stats.remote(root_id, keys.pop(0), nodes_children))
+			while len(keys) and pool.idle_count():
+				pool.submit('do_get_node_subgraph_stats', *keys.pop(0), graph_ref)
 
 			finished_stats += 1
 
@@ -369,45 +574,281 @@ class PatternSolver:
 
 		return root_node_redundants
 
+	# stats of all nodes in one pass over the graph in the main process, see GraphStats.py
+	def construct_dag_stats(self, graph):
+		import GraphStats
+		stats_time = time.perf_counter()
+		self.nodes_stats, root_node_redundants = GraphStats.construct_dag_stats(graph)
+
+		if self.args.verbos:
+			print(f"Stats of {graph.size():,} nodes generated in {time.perf_counter() - stats_time:.2f} seconds\n")
+
+		return root_node_redundants
+
+	# stats of the root alone, in one pass over the edges, see GraphStats.py
+	def construct_root_stats(self, graph):
+		import GraphStats
+		stats_time = time.perf_counter()
+		self.nodes_stats, root_node_redundants = GraphStats.construct_root_stats(graph)
+
+		if self.args.verbos:
+			print(f"Stats of the root of {graph.size():,} nodes generated in {time.perf_counter() - stats_time:.2f} seconds\n")
+
+		return root_node_redundants
+
+	def get_nodes_count(self):
+		if self.graph is not None:
+			return self.graph.size()
+		return len(self.nodes_children)
+
+	# the stats are kept by the ids of the nodes in the graph, the DB by their hashes
 	def save_in_global_db(self, root_redundants):
 
-		for node_id in self.nodes_stats.keys():
-			unique_nodes    = self.nodes_stats[node_id][UNIQUE_COUNT]
-			redundant_nodes = self.nodes_stats[node_id][REDUNDANT_COUNT]
-			redundant_hits  = self.nodes_stats[node_id][REDUNDANT_HITS]
-			self.db_adaptor.gs_update_count(self.global_table_name, unique_nodes, redundant_nodes, redundant_hits, node_id)
+		for node in range(self.graph.size()):
+			unique_nodes    = int(self.nodes_stats[node][UNIQUE_COUNT])
+			redundant_nodes = int(self.nodes_stats[node][REDUNDANT_COUNT])
+			redundant_hits  = int(self.nodes_stats[node][REDUNDANT_HITS])
+			self.db_adaptor.gs_update_count(self.global_table_name, unique_nodes, redundant_nodes, redundant_hits, self.graph.get_hash(node))
 
 		# saving redundants hits for redundant nodes
-		for red_id, redundant_times  in root_redundants.items():
-			self.db_adaptor.gs_update_redundant_times(self.global_table_name, redundant_times, red_id)
+		for red_node, redundant_times  in root_redundants.items():
+			self.db_adaptor.gs_update_redundant_times(self.global_table_name, redundant_times, self.graph.get_hash(red_node))
+
+		self.db_adaptor.gs_flush()
+
+
+	# hand out batches of nodes from the queue to at most the given number of idle workers of the pool. The batches are
+	# small enough to leave nodes for the other workers
+	def distribute_nodes(self, pool, squeue, workers, input_mode, dot, sort_by_size, thief_method, break_on_squeue_size=0):
+		for n in range(min(workers, pool.idle_count())):
+			if squeue.is_empty():
+				break
+			batch_size = min(squeue.size(), max(1, squeue.size() // (pool.size() * 2)))
+			nodes = [squeue.pop() for i in range(batch_size)]
+
+			i = self.started_processes
+			self.started_processes = self.started_processes + 1
+
+			logger.info(f"Starting task {i} with {len(nodes)} nodes")
+			pool.submit('process_nodes_task', nodes, f'Process #{i}', input_mode, dot, sort_by_size, thief_method, break_on_squeue_size)
 
+	# merge the subgraph of a worker, the nodes a worker didn't expand have no children in its subgraph
+	@staticmethod
+	def merge_nodes_children(nodes_children, process_nodes_children):
+		for k in process_nodes_children.keys():
+			if nodes_children.get(k, False) and len(nodes_children[k]) >= len(process_nodes_children[k]):
+				continue
+			nodes_children[k] = process_nodes_children[k]
+
+	# send the subgraph of the expanded nodes to the main process, the worker only keeps their ids
+	def stream_nodes_children(self, nodes_children, expanded_ids):
+		self.result_stream.put((None, {node_id: nodes_children.pop(node_id) for node_id in expanded_ids}))
+		self.known_nodes.update(expanded_ids)
+		expanded_ids.clear()
+
+	# merge the subgraphs the workers have streamed so far, and keep the first streamed solution
+	def merge_streamed_results(self, nodes_children):
+		size = self.result_stream.qsize()
+		if not size:
+			return
+		for process_solution, process_nodes_children in self.result_stream.get_nowait_batch(size):
+			if process_solution:
+				if not self.streamed_solution:
+					self.streamed_solution = process_solution
+			else:
+				self.stream_deltas += 1
+				self.streamed_nodes += len(process_nodes_children)
+				self.merge_nodes_children(nodes_children, process_nodes_children)
+
+	# wait for the next task of the pool to finish, returns its result. With streamed results, the subgraphs the workers
+	# stream meanwhile are merged, and None is returned as soon as a solution is streamed if the solving should stop then
+	def get_next_result(self, pool, nodes_children):
+		if self.result_stream is None:
+			return pool.get_next()
+
+		result = None
+		while result is None:
+			result = pool.get_next(timeout=STREAM_POLL)
+			self.merge_streamed_results(nodes_children)
+			if self.streamed_solution and self.args.exit_upon_solving:
+				return None
+		return result
 
-	def process_nodes_queue(self, cnf_set, input_mode, dot, generate_threads=False, name="main", is_sub_process=False, sort_by_size=False, thief_method=False, break_on_squeue_size=0):
+	# stop the running tasks of the pool once a solution is found: the workers see the cancel flag within
+	# CANCEL_POLL_NODES nodes and return, their results are dropped. The children of the merged nodes that the stopped
+	# workers had are left unexpanded
+	def stop_workers(self, pool, nodes_children):
+		logger.info("Terminating all processes....")
+		self.cancel_flag.set()
+		while pool.pending_count():
+			try:
+				pool.get_next()
+			except Exception as error:
+				logger.error("Error - {0}".format(error))
+		self.record_cancel_latency()
+
+		for child_id in [child_id for children in nodes_children.values() for child_id in children if child_id not in nodes_children]:
+			nodes_children[child_id] = []
+
+	def record_cancel_latency(self):
+		solution_time = self.cancel_flag.get_time()
+		if solution_time:
+			self.cancel_latency = time.time() - solution_time
+
+	# work stealing: the queued nodes are spread over the workers of the pool, which share them through a coordinator
+	# until all subtrees are done. Returns whether a satisfiable node was found, and the solution
+	def steal_nodes(self, pool, squeue, nodes_children, input_mode, dot, sort_by_size, thief_method):
+		import ray
+		from WorkCoordinator import WorkCoordinator
+		is_satisfiable = False
+		solution = None
 
+		coordinator = WorkCoordinator.remote(pool.size())
+		nodes = []
+		while not squeue.is_empty():
+			nodes.append(squeue.pop())
+		ray.get([coordinator.donate.remote(worker, nodes[worker::pool.size()]) for worker in range(pool.size())])
+
+		logger.info(f"Starting work stealing of {len(nodes)} nodes on {pool.size()} workers")
+		for worker in range(pool.size()):
+			pool.submit('steal_nodes_task', coordinator, worker, f'Worker #{worker}', input_mode, dot, sort_by_size, thief_method)
+
+		while pool.pending_count():
+			result = self.get_next_result(pool, nodes_children)
+			if result is None:
+				is_satisfiable = True
+				solution = self.streamed_solution
+				self.stop_workers(pool, nodes_children)
+				break
+
+			worker, process_is_satisfiable, process_nodes_children, process_solution, process_counters, process_times = result
+			logger.info(f"Worker #{worker} done.")
+
+			self.add_counters(process_counters)
+			self.worker_times[worker] = process_times
+			self.merge_nodes_children(nodes_children, process_nodes_children)
+
+			is_satisfiable |= process_is_satisfiable
+			if process_solution and not solution:
+				solution = process_solution
+
+		for worker, steals in enumerate(ray.get(coordinator.get_steals.remote())):
+			if worker in self.worker_times:
+				self.worker_times[worker] += (steals,)
+		ray.kill(coordinator)
+
+		# the other workers have stopped by themselves
+		if solution and self.args.exit_upon_solving:
+			self.record_cancel_latency()
+
+		return is_satisfiable, solution
+
+	# a work stealing task of a pool worker: expands the nodes it gets from the coordinator until all work is done.
+	# Returns the subgraph of all its nodes, its counters, and its busy time, idle time and number of expanded nodes
+	def steal_nodes_task(self, coordinator, worker, name, input_mode, dot, sort_by_size, thief_method):
+		import ray
+		counters = self.get_counters()
+		expanded_nodes = self.expanded_nodes
 		nodes_children = {}
 		is_satisfiable = False
 		solution = None
-		starting_len = len(cnf_set.clauses)
+		busy_time = idle_time = 0
+
+		while True:
+			start_time = time.perf_counter()
+			nodes = ray.get(coordinator.steal.remote(worker))
+			while nodes == []:
+				time.sleep(STEAL_WAIT)
+				nodes = ray.get(coordinator.steal.remote(worker))
+			idle_time += time.perf_counter() - start_time
+			if nodes is None:
+				break
+
+			start_time = time.perf_counter()
+			process_squeue, process_is_satisfiable, process_nodes_children, process_solution = self.process_nodes_queue(nodes, input_mode, dot, generate_threads=False, name=name,
+				is_sub_process=True, sort_by_size=sort_by_size, thief_method=thief_method, coordinator=coordinator, worker=worker)
+			busy_time += time.perf_counter() - start_time
+
+			# leave the nodes to the other workers, which don't wait for this one anymore
+			if process_nodes_children == None:
+				coordinator.leave.remote(worker, nodes)
+				break
+
+			self.merge_nodes_children(nodes_children, process_nodes_children)
+			is_satisfiable |= process_is_satisfiable
+			if process_solution and not solution:
+				solution = process_solution
+				if self.args.exit_upon_solving:
+					coordinator.stop.remote()
+
+			if self.cancelled:
+				break
+
+		return worker, is_satisfiable, nodes_children, solution, self.get_counters(counters), (busy_time, idle_time, self.expanded_nodes - expanded_nodes)
+
+	# a task of a pool worker, returns the nodes of the task and the counters of the task with the result
+	def process_nodes_task(self, nodes, name, input_mode, dot, sort_by_size, thief_method, break_on_squeue_size):
+		counters = self.get_counters()
+		result = self.process_nodes_queue(nodes, input_mode, dot, generate_threads=False, name=name, is_sub_process=True, sort_by_size=sort_by_size, thief_method=thief_method, break_on_squeue_size=break_on_squeue_size)
+		return (name, nodes) + result + (self.get_counters(counters),)
+
+	def process_nodes_queue(self, cnf_set, input_mode, dot, generate_threads=False, name="main", is_sub_process=False, sort_by_size=False, thief_method=False, break_on_squeue_size=0, coordinator=None, worker=None):
+
+		nodes_children = {}
+		is_satisfiable = False
+		solution = None
+		# a pool worker gets a batch of nodes
+		nodes = cnf_set if isinstance(cnf_set, list) else [cnf_set]
+		starting_len = nodes[0].clauses_count()
 
 		db_adaptor = self.db_adaptor
 		try:
-			squeue = SuperQueue.SuperQueue(name=name, use_runtime_db=self.use_runtime_db, problem_id=cnf_set.get_hash().hex())
-			squeue.insert(cnf_set)
-			nodes_children[cnf_set.id] = []
-
-		except (Exception, psycopg2.DatabaseError) as error:
+			squeue = SuperQueue.SuperQueue(name=name, use_runtime_db=self.use_runtime_db, problem_id=nodes[0].get_hash().hex(), set_class=type(nodes[0]),
+				db_backend=self.args.db_backend, db_file=self.args.db_file)
+			for node in nodes:
+				squeue.insert(node)
+				nodes_children[node.id] = []
+
+			# with a shared seen set, the nodes a worker queues are claimed in batches, right before the first of them
+			# is expanded. The nodes of the task are taken already
+			seen_set = self.seen_set if is_sub_process else None
+			unclaimed = {}
+			skipped = set()
+			# with streamed results, the subgraph of every STREAM_BATCH_NODES expanded nodes is sent while the worker runs
+			result_stream = self.result_stream if is_sub_process else None
+			expanded_ids = []
+			cancel_flag = self.cancel_flag if is_sub_process else None
+			if coordinator:
+				import ray
+			if seen_set:
+				seen_set.add([node.id for node in nodes])
+
+		except Exception as error:
 			logger.error("DB Error: " + str(error))
 			logger.critical("Error - {0}".format(traceback.format_exc()))
 			db_adaptor = None
 			if is_sub_process:
-				return None, None, None
+				return None, None, None, None
 			return False
 
 		while not squeue.is_empty() and (not (is_sub_process and break_on_squeue_size > 0 and squeue.size() >= break_on_squeue_size)) and (not (bool(solution) & self.args.exit_upon_solving)):
 
+			# the next nodes are looked up in the global DB at once
+			if self.args.use_global_db and self.args.gdb_prefetch and squeue.peek_ids(1)[0] not in self.gdb_prefetched:
+				self.prefetch_gdb(squeue, db_adaptor)
+
 			cnf_set = squeue.pop()
 			logger.debug("Set #{0}".format(cnf_set.id))
 
+			if seen_set:
+				if cnf_set.id in unclaimed:
+					skipped.update(seen_set.claim(list(unclaimed)))
+					unclaimed.clear()
+				# another worker expands it
+				if cnf_set.id in skipped:
+					self.seen_set_skips += 1
+					continue
+
 			## Evaluate
 			## check first if the set is unsolved in the global db. If so, just grab the children from there.
 			## if it's solved in gdb, it wouldn't be here in this loop at the first place.
@@ -421,13 +862,16 @@ class PatternSolver:
 					self.nodes_found_in_gdb += 1
 					children_pulled_from_gdb = True
 
-			# TIME CONSUMER 1 sec
+			# the strings of the children before their conversion are only needed for the graph file
+			strings_before = [] if self.args.output_graph_file else None
+			# TIME CONSUMER 1+ sec
 			if not children_pulled_from_gdb:
-				(s1, s2) = cnf_set.evaluate()
+				(s1, s2) = self.expand_node(cnf_set, (self.args.start_mode if generate_threads or (break_on_squeue_size > 0) else input_mode), sort_by_size, thief_method, strings_before)
+			elif self.args.output_graph_file:
+				strings_before = [s1.to_string(), s2.to_string()]
 
-			for child in (s1, s2):
-				# TIME CONSUMER 0.1 sec
-				child_str_before = child.to_string()
+			for i, child in enumerate((s1, s2)):
+				child_str_before = strings_before[i] if self.args.output_graph_file else None
 
 				# check if the set is already evaluated to boolean value
 				if child.value != None:
@@ -438,27 +882,24 @@ class PatternSolver:
 						solution = child.evaluated_vars
 						# sort by key
 						solution = dict(sorted(solution.items()))
+						if result_stream is not None:
+							result_stream.put((solution, None))
+						if cancel_flag is not None:
+							cancel_flag.set()
 						if self.args.verbos:
 							logger.info(f"\nProcess '{name}' found the solution!\n")
 
 				else:
-					if not children_pulled_from_gdb:
-						# TIME CONSUMER 1+ sec
-						child.to_lo_condition((self.args.start_mode if generate_threads or (break_on_squeue_size > 0) else input_mode), sort_by_size, thief_method)
-						# TIME CONSUMER 0.1 sec
-						child_hash = child.get_hash(force_recalculate=True)
-
-					# if chid pulled from gdb, no need to recompute the hash to save time
+					# the hash of a new child is computed by expand_node(), a child pulled from gdb has the hash of its body
 					child_hash = child.get_hash()
 					child.id = child_hash
 					# check if we have processed the set before
-					if nodes_children.get(child_hash, False) != False:
+					if nodes_children.get(child_hash, False) != False or child_hash in self.known_nodes:
 						child.status = NODE_REDUNDANT
 					else:
 						child.status = NODE_UNIQUE
 
-				child_str_after = child.to_string()
-				child_hash = child.get_hash()
+				child_str_after = child.to_string() if self.args.output_graph_file else None
 
 				if child.status == NODE_UNIQUE:
 					self.uniques += 1
@@ -490,27 +931,57 @@ class PatternSolver:
 
 			# CNF nodes in this loop are all unique, if they weren't they wouldn't be in the queue
 			# if insertion in the global table is successful, save children in the queue,
-			# otherwise, the cnf_set is already solved in the global DB table
+			# otherwise, the cnf_set is already solved in the global DB table.
+			# The rows are buffered (-gb): a buffered row is SUCCESS, only the row that fills the buffer learns about the
+			# rows of its batch stored by another run meanwhile. The children of the other rows of the batch are expanded
+			# again, which repeats work but doesn't change the table, the rows already there are skipped. -gb 1 reports
+			# every node stored by another run
 			global_save_status = self.save_parent_children(cnf_set, s1.get_hash(), s2.get_hash(), db_adaptor)
 			if global_save_status == SUCCESS:
 				for child in (s1, s2):
 					if child.status == NODE_UNIQUE:
 						squeue.insert(child)
+						if seen_set:
+							unclaimed[child.id] = True
 						#if max_threads > 0 and master_threads and len(master_threads) < max_threads:
 						#    print()
 
 			elif global_save_status == DB_UNIQUE_VIOLATION:
 				logger.debug("Node #{} is already found 'during execution' in global DB.".format(cnf_set.id))
 
+			# the children of a node that can't be saved would be dropped with their subtrees, the run stops instead
+			elif global_save_status == DB_UNKNOWN_ERROR:
+				raise RuntimeError("Node #{0} can't be saved in the global DB table {1}".format(cnf_set.get_hash().hex(), self.global_table_name))
+
 			# if both children are boolean, then cnf_set is a leaf node
 			if s1.value != None and s2.value != None:
 				self.leaves.append(cnf_set.id)
 
+			self.expanded_nodes += 1
+			if result_stream is not None:
+				expanded_ids.append(cnf_set.id)
+				if len(expanded_ids) >= STREAM_BATCH_NODES:
+					self.stream_nodes_children(nodes_children, expanded_ids)
+
+			# stop when another worker has found a solution
+			if cancel_flag is not None and self.expanded_nodes % CANCEL_POLL_NODES == 0 and cancel_flag.get_time():
+				self.cancelled = True
+				break
+
+			# with work stealing, move the oldest half of the queue to the coordinator when other workers wait for nodes
+			if coordinator:
+				if self.expanded_nodes % STEAL_SYNC_NODES == 0:
+					waiting_workers = ray.get(coordinator.sync.remote())
+					if waiting_workers is None:
+						break
+					if waiting_workers and squeue.size() > 1:
+						coordinator.donate.remote(worker, [squeue.pop() for i in range(squeue.size() // 2)])
+
 			if False and self.args.verbos:
-				logger.info(f"Process '{name}': Progress {round((1-len(cnf_set.clauses)/starting_len)*100)}%, nodes so far: {self.uniques:,} uniques and {self.redundant_hits:,} redundant hits...",)
+				logger.info(f"Process '{name}': Progress {round((1-cnf_set.clauses_count()/starting_len)*100)}%, nodes so far: {self.uniques:,} uniques and {self.redundant_hits:,} redundant hits...",)
 
 			if self.args.verbos and (len(nodes_children) % 20 == 0): # and not is_sub_process:
-				logger.info(f"Process '{name}': Progress {round((1-len(cnf_set.clauses)/starting_len)*100)}% | nodes: {len(nodes_children)} | squeue: {squeue.size()} | uniques: {self.uniques:,} | redunt: {self.redundant_hits:,}...",)
+				logger.info(f"Process '{name}': Progress {round((1-cnf_set.clauses_count()/starting_len)*100)}% | nodes: {len(nodes_children)} | squeue: {squeue.size()} | uniques: {self.uniques:,} | redunt: {self.redundant_hits:,}...",)
 
 			# if number of running threads less than limit and less than queue size, create a new thread here and call process_nodes_queue
 			if generate_threads and (squeue.size() >= (self.max_threads if self.max_threads < 32 else 32)):
@@ -521,79 +992,202 @@ class PatternSolver:
 				print()
 				threads_to_create = int(squeue.size()) if squeue.size() < self.max_threads else int(self.max_threads)
 
-				for n in range(0, threads_to_create):
-					i = self.started_processes
-					self.started_processes=self.started_processes + 1
+				pool = self.get_worker_pool()
 
-					logger.info(f"Creating process {i}")
-					cnf_set = squeue.pop()
-					rps = RemotePatternSolver.remote(PatternSolver(args=PatternSolverArgs(self.args)), name=f'Process #{i}', node=cnf_set)
-					self.threads.append(rps.process_nodes_queue.remote(input_mode=input_mode, dot=dot, sort_by_size=sort_by_size, thief_method=thief_method, break_on_squeue_size=(8 if generate_threads else 0)))
+				# with work stealing, the workers get all queued nodes at once, and share them until all subtrees are done
+				if self.args.work_stealing:
+					generate_threads = False
+					process_is_satisfiable, process_solution = self.steal_nodes(pool, squeue, nodes_children, input_mode, dot, sort_by_size, thief_method)
+					is_satisfiable |= process_is_satisfiable
+					if process_solution and not solution:
+						solution = process_solution
 
-				while len(self.threads):
+				else:
+					self.distribute_nodes(pool, squeue, threads_to_create, input_mode, dot, sort_by_size, thief_method, break_on_squeue_size=(8 if generate_threads else 0))
 
-					done_id, self.threads = ray.wait(self.threads)
-					rps, process_squeue, process_is_satisfiable, process_nodes_children, process_solution = ray.get(done_id[0])
+					while pool.pending_count():
 
-					logger.info(f"{rps.name} retrieving queue...")
-					logger.info(f"{rps.name} done.")
+						result = self.get_next_result(pool, nodes_children)
+						# a worker streamed the solution, no need to wait for the others
+						if result is None:
+							is_satisfiable = True
+							solution = self.streamed_solution
+							self.stop_workers(pool, nodes_children)
+							break
 
-					# Return to db after serialization
-					process_squeue.relink_db()
+						process_name, process_nodes, process_squeue, process_is_satisfiable, process_nodes_children, process_solution, process_counters = result
 
-					# in case the child process exited before it solve the problem, and get the main process to solve it
-					if process_nodes_children == None and not process_solution:
-						squeue.insert(rps.node)
-					else:
-						for k in process_nodes_children.keys():
-							if nodes_children.get(k, False) and len(nodes_children[k]) >= len(process_nodes_children[k]):
-								continue
-							nodes_children[k] = process_nodes_children[k]
-
-						if process_is_satisfiable != None:
-							is_satisfiable |= process_is_satisfiable
-
-						#solution = process_solution
-						if process_solution:
-							solution = process_solution
-							if self.args.exit_upon_solving:
-								logger.info("Terminating all processes....")
-								break
-
-					# check for not ready sub queue
-					while (process_squeue.size() > 0):
-						squeue.insert(process_squeue.pop())
-
-					if self.args.verbos and not is_sub_process:
-						logger.info(f"Process '{name}': Progress {round((1-len(cnf_set.clauses)/starting_len)*100)}% | nodes: {len(nodes_children)} | squeue: {squeue.size()} | uniques: {self.uniques:,} | redunt: {self.redundant_hits:,}...",)
-
-					# when no more thread should be generate, check and run if more work is available
-					if not generate_threads:
-						while (len(self.threads) < self.max_threads) and (squeue.size() > 0):
-							i = self.started_processes
-							self.started_processes=self.started_processes + 1
-
-							logger.info(f"Creating process {i}")
-							cnf_set = squeue.pop()
-							rps = RemotePatternSolver.remote(PatternSolver(args=PatternSolverArgs(self.args)), name=f'Process #{i}', node=cnf_set)
-							self.threads.append(rps.process_nodes_queue.remote(input_mode=input_mode, dot=dot, sort_by_size=sort_by_size, thief_method=thief_method))
-
-						if len(self.threads) > 0:
-							logger.info(f"\nNew tasks distributed, currently running processes: {len(self.threads)}\n")
+						logger.info(f"{process_name} retrieving queue...")
+						logger.info(f"{process_name} done.")
+
+						self.add_counters(process_counters)
+
+						# Return to db after serialization
+						if process_squeue is not None:
+							process_squeue.relink_db()
+
+						# in case the child process exited before it solve the problem, and get the main process to solve it
+						if process_nodes_children == None and not process_solution:
+							for node in process_nodes:
+								squeue.insert(node)
+						else:
+							self.merge_nodes_children(nodes_children, process_nodes_children)
+
+							if process_is_satisfiable != None:
+								is_satisfiable |= process_is_satisfiable
+
+							#solution = process_solution
+							if process_solution:
+								solution = process_solution
+								if self.args.exit_upon_solving:
+									self.stop_workers(pool, nodes_children)
+									break
+
+						# check for not ready sub queue
+						while (process_squeue is not None and process_squeue.size() > 0):
+							squeue.insert(process_squeue.pop())
+
+						if self.args.verbos and not is_sub_process:
+							logger.info(f"Process '{name}': Progress {round((1-cnf_set.clauses_count()/starting_len)*100)}% | nodes: {len(nodes_children)} | squeue: {squeue.size()} | uniques: {self.uniques:,} | redunt: {self.redundant_hits:,}...",)
+
+						# when no more thread should be generate, check and run if more work is available
+						if not generate_threads:
+							self.distribute_nodes(pool, squeue, pool.idle_count(), input_mode, dot, sort_by_size, thief_method)
+
+							if pool.pending_count() > 0:
+								logger.info(f"\nNew tasks distributed, currently running processes: {pool.pending_count()}\n")
 
 		if is_sub_process:
 			logger.info(f"Process {name} data is sent to the main process")
 			logger.info(f"Process {name} is completed!")
+			# drop the nodes left in the queue that other workers have taken, the rest is claimed for the main process
+			if seen_set and not squeue.is_empty():
+				if unclaimed:
+					skipped.update(seen_set.claim(list(unclaimed)))
+				left_nodes = []
+				while not squeue.is_empty():
+					left_nodes.append(squeue.pop())
+				for node in left_nodes:
+					if node.id in skipped:
+						self.seen_set_skips += 1
+					else:
+						squeue.insert(node)
+			# write the buffered rows of the worker before the main process reads them
+			if self.args.use_global_db and db_adaptor and not db_adaptor.gs_flush():
+				raise RuntimeError("The buffered nodes can't be written to the global DB table {0}".format(self.global_table_name))
 			# remove the DBAdapter() while not serializable
 			squeue.unlink_db()
+			# the nodes left in the queue are not expanded yet
+			self.known_nodes.update(node_id for node_id, children in nodes_children.items() if children)
 			# return serializable values
 			return squeue, is_satisfiable, nodes_children, solution
 		else:
+			if self.args.use_global_db and db_adaptor and not db_adaptor.gs_flush():
+				raise RuntimeError("The buffered nodes can't be written to the global DB table {0}".format(self.global_table_name))
 			self.is_satisfiable = is_satisfiable
 			self.nodes_children = nodes_children
 			self.solution       = solution
 			logger.info(f"\n\nNon-Deterministic Processing completed!\n")
 
+	# branch a node and prepare its children: propagate, decompose, convert the children without a value to the solution
+	# mode and hash them. strings_before: a list that gets the string of every child before its conversion, if given
+	def expand_node(self, cnf_set, mode, sort_by_size=False, thief_method=False, strings_before=None):
+		children = cnf_set.evaluate()
+		for child in children:
+			# propagate the forced variables of the new child, before it's checked for a value
+			if self.args.propagate:
+				forced_vars = child.propagate(self.args.propagate == PROPAGATE_PURE)
+				if forced_vars:
+					self.propagated_nodes += 1
+					self.forced_vars += forced_vars
+
+			# solve the variable-disjoint parts of the new child on their own
+			if self.args.decompose and child.value == None:
+				self.decompose_node(child, mode, sort_by_size, thief_method)
+
+			if strings_before is not None:
+				strings_before.append(child.to_string())
+
+			if child.value == None:
+				child.to_lo_condition(mode, sort_by_size, thief_method)
+				child.id = child.get_hash(force_recalculate=True)
+		return children
+
+	# a task of a pool worker in the level engine, returns the children of every node and the counters of the task
+	def expand_nodes_task(self, nodes, mode, sort_by_size, thief_method):
+		counters = self.get_counters()
+		children = [self.expand_node(cnf_set, mode, sort_by_size, thief_method) for cnf_set in nodes]
+		return children, self.get_counters(counters)
+
+	# expand a slice of a level, on the workers of the pool if it's big enough. Returns the children of every node
+	def expand_nodes(self, nodes, mode, sort_by_size, thief_method):
+		if self.max_threads < 2 or len(nodes) < 2 * self.max_threads:
+			return [self.expand_node(cnf_set, mode, sort_by_size, thief_method) for cnf_set in nodes]
+
+		pool = self.get_worker_pool()
+		chunk_size = math.ceil(len(nodes) / (4 * pool.size()))
+		chunks = [nodes[i:i + chunk_size] for i in range(0, len(nodes), chunk_size)]
+		chunks_children = [None] * len(chunks)
+		chunk_indexes = {}
+		next_chunk = 0
+		while next_chunk < len(chunks) or pool.pending_count():
+			while next_chunk < len(chunks) and pool.idle_count():
+				chunk_indexes[pool.submit('expand_nodes_task', chunks[next_chunk], mode, sort_by_size, thief_method)] = next_chunk
+				next_chunk += 1
+			task, (chunk_children, counters) = pool.get_next_task()
+			self.add_counters(counters)
+			chunks_children[chunk_indexes.pop(task)] = chunk_children
+
+		# in the order of the nodes, so the first parent of a child is always the same
+		return [children for chunk_children in chunks_children for children in chunk_children]
+
+	# level engine: the tree is processed one BFS level at a time. Every level is expanded in slices of at most
+	# LEVEL_SLICE_NODES nodes, and its children are deduplicated in one pass before they form the next level
+	def process_levels(self, root_set, mode, sort_by_size=False, thief_method=False):
+		nodes_children = {root_set.id: []}
+		is_satisfiable = False
+		solution = None
+		frontier = [root_set]
+
+		while frontier and not (solution and self.args.exit_upon_solving):
+			level = {"nodes": len(frontier), "unique": 0, "redundant": 0, "evaluated": 0}
+			next_frontier = []
+
+			for start in range(0, len(frontier), LEVEL_SLICE_NODES):
+				nodes = frontier[start:start + LEVEL_SLICE_NODES]
+				for cnf_set, children in zip(nodes, self.expand_nodes(nodes, mode, sort_by_size, thief_method)):
+					for child in children:
+						if child.value != None:
+							level["evaluated"] += 1
+							if child.value == True:
+								is_satisfiable = True
+								if solution == None:
+									solution = dict(sorted(child.evaluated_vars.items()))
+						elif child.id in nodes_children:
+							level["redundant"] += 1
+							self.redundant_hits += 1
+							self.redundant_ids[child.id] = 1
+							nodes_children[cnf_set.id].append(child.id)
+						else:
+							level["unique"] += 1
+							self.uniques += 1
+							nodes_children[child.id] = []
+							nodes_children[cnf_set.id].append(child.id)
+							next_frontier.append(child)
+
+					if children[0].value != None and children[1].value != None:
+						self.leaves.append(cnf_set.id)
+
+			self.levels.append(level)
+			if self.args.verbos:
+				logger.info(f"Level {len(self.levels)}: {level['nodes']:,} nodes | {level['unique']:,} unique children | {level['redundant']:,} redundant hits | {level['evaluated']:,} evaluated")
+			frontier = next_frontier
+
+		self.is_satisfiable = is_satisfiable
+		self.nodes_children = nodes_children
+		self.solution = solution
+		logger.info(f"\n\nNon-Deterministic Processing completed!\n")
+
 	@staticmethod
 	def format_duration(seconds):
 		minutes, seconds = divmod(seconds, 60)
@@ -625,10 +1219,17 @@ class PatternSolver:
 		# graph drawing
 		graph_attr={}
 		graph_attr["splines"] = "polyline"
-		dot = Digraph(comment='The CNF-tree', format='svg', graph_attr=graph_attr)
+		dot = None
+		if self.args.output_graph_file:
+			from graphviz import Digraph
+			dot = Digraph(comment='The CNF-tree', format='svg', graph_attr=graph_attr)
 
 		logger.debug("Set #1 - to root set to {} mode".format(self.args.mode))
-		setbefore = root_set.to_string()
+		setbefore = root_set.to_string() if self.args.output_graph_file else None
+
+		# keep the nodes in compact array-backed form, children of a CompactSet are CompactSet objects too
+		if self.args.compact_sets:
+			root_set = CompactSet.from_set(root_set)
 
 		# create a map of variables, root node has a default map of a variable to itself
 		vars = root_set.get_variables()
@@ -650,8 +1251,10 @@ class PatternSolver:
 		# use global sets table
 		if self.args.use_global_db:
 			# create the table if not exist
-			db_adaptor.gs_create_table(self.global_table_name)
-			if not self.args.gdb_no_mem:
+			self.db_adaptor.gs_create_table(self.global_table_name)
+			if self.args.gdb_bloom:
+				self.load_gdb_filter()
+			elif not self.args.gdb_no_mem:
 				self.load_set_records(len(root_set.clauses))
 
 		# check if we have processed the CNF before
@@ -672,8 +1275,31 @@ class PatternSolver:
 			if self.max_threads:
 				logger.info(f"\n\nNumber of processes = {self.max_threads}\n\n")
 
+			if self.max_threads and self.args.seen_set:
+				from SeenSet import SeenSet
+				self.seen_set = SeenSet(self.args.seen_set)
+			if self.max_threads and self.args.stream_results:
+				import ray.util.queue
+				self.result_stream = ray.util.queue.Queue(actor_options={"num_cpus": 0})
+			if self.max_threads and self.args.exit_upon_solving:
+				self.cancel_flag = Executors.create_cancel_flag(self.args.backend)
+
 			# Main computation to process the root node
-			self.process_nodes_queue(root_set, input_mode, dot, bool(self.max_threads), sort_by_size=self.args.sort_by_size, thief_method=self.args.thief_method)
+			if self.args.engine == ENGINE_LEVELS:
+				self.process_levels(root_set, input_mode, sort_by_size=self.args.sort_by_size, thief_method=self.args.thief_method)
+			else:
+				self.process_nodes_queue(root_set, input_mode, dot, bool(self.max_threads), sort_by_size=self.args.sort_by_size, thief_method=self.args.thief_method)
+
+			if self.seen_set:
+				self.seen_set_stats = self.seen_set.get_stats()
+				self.seen_set.shutdown()
+				self.seen_set = None
+			if self.result_stream is not None:
+				self.result_stream.shutdown()
+				self.result_stream = None
+			if self.cancel_flag is not None:
+				self.cancel_flag.shutdown()
+				self.cancel_flag = None
 
 			# Stats timing
 			eval_time = time.time()
@@ -690,15 +1316,26 @@ class PatternSolver:
 				if self.args.verbos:
 					logger.info("=== Generating subgraph stats...\n")
 
-				logger.info(f"Current recursion limit = {sys.getrecursionlimit()}")
-				logger.info(f"Setting recursion limit to {sys.getrecursionlimit() * 2}")
+				# the dict of the graph isn't needed anymore once it's compacted
+				from CsrGraph import CsrGraph
+				self.graph = CsrGraph(self.nodes_children, root_set.id)
+				self.nodes_children = None
 
-				sys.setrecursionlimit(sys.getrecursionlimit() * 2)
-				root_redundants = self.construct_graph_stats(root_set.id, self.nodes_children, self.max_threads)
+				if self.args.stats == STATS_DFS:
+					logger.info(f"Current recursion limit = {sys.getrecursionlimit()}")
+					logger.info(f"Setting recursion limit to {sys.getrecursionlimit() * 2}")
 
-				self.uniques = self.nodes_stats[root_set.id][UNIQUE_COUNT]
-				self.redundants = self.nodes_stats[root_set.id][REDUNDANT_COUNT]
-				self.redundant_hits = self.nodes_stats[root_set.id][REDUNDANT_HITS]
+					sys.setrecursionlimit(sys.getrecursionlimit() * 2)
+					root_redundants = self.construct_graph_stats(self.graph, self.max_threads)
+				elif self.args.stats == STATS_ROOT:
+					root_redundants = self.construct_root_stats(self.graph)
+				else:
+					root_redundants = self.construct_dag_stats(self.graph)
+
+				# the root is node 0
+				self.uniques = int(self.nodes_stats[0][UNIQUE_COUNT])
+				self.redundants = int(self.nodes_stats[0][REDUNDANT_COUNT])
+				self.redundant_hits = int(self.nodes_stats[0][REDUNDANT_HITS])
 
 				if self.args.verbos:
 					logger.info("=== Done getting stats. ===")
@@ -709,13 +1346,16 @@ class PatternSolver:
 
 					self.save_in_global_db(root_redundants)
 
+			if self.gdb_filter is not None:
+				self.save_gdb_filter()
+
 		else:
 
 			if self.args.verbos:
 				logger.info("Input set is found in the global DB")
 				logger.info("Pulling Set's data from the DB...")
 			self.nodes_found_in_gdb = 1
-			if db_adaptor is None:
+			if self.db_adaptor is None:
 				self.uniques = -1
 				self.redundants = -1
 				self.redundant_hits = -1
@@ -723,13 +1363,16 @@ class PatternSolver:
 			self.uniques = set_data["unique_nodes"]
 			self.redundants = set_data["redundant_nodes"]
 			self.redundant_hits = set_data["redundant_hits"]
+			eval_time = time.time()
 
-		# Retrieve the number of CPUs from the Ray cluster
-		cluster_resources = ray.cluster_resources()
-		num_cpus = cluster_resources.get("CPU", 1)  # Defaults to 1 if not available
+		self.shutdown_worker_pool()
+
+		# Retrieve the number of CPUs from the Ray cluster, or of this machine
+		num_cpus = Executors.get_cpu_count()
 
 		str_satisfiable = "NOT satisfiable."
 		if self.is_satisfiable: str_satisfiable = "SATISFIABLE!"
+		import psutil
 		process = psutil.Process(os.getpid())
 		memusage = process.memory_info().rss  # in bytes
 		stats = '\\n' + "    CPU total: {}".format(int(num_cpus))
@@ -786,13 +1429,57 @@ class PatternSolver:
 		elif self.args.multiply:
 			stats += '\\n' + f"The input numbers {self.args.multiply[0]} and {self.args.multiply[1]} can't be multiplied on the input CNF."
 
-		stats += '\\n' + f"===== UNIQUE NODES: {len(self.nodes_children):,} =====\n"
+		stats += '\\n' + f"===== UNIQUE NODES: {self.get_nodes_count():,} =====\n"
+		if self.pool_workers:
+			stats += '\\n' + "Worker pool: {0} workers, start-up: {1}, compute: {2} in {3:,} tasks\n".format(self.pool_workers,
+				PatternSolver.format_duration(self.pool_startup_time), PatternSolver.format_duration(self.pool_compute_time), self.pool_tasks)
+		for worker, (busy_time, idle_time, nodes, steals) in sorted(self.worker_times.items()):
+			stats += '\\n' + "Worker #{0}: busy {1}, idle {2} ({3:.0f}% busy), {4:,} nodes expanded, {5:,} steals".format(worker, PatternSolver.format_duration(busy_time),
+				PatternSolver.format_duration(idle_time), (100 * busy_time / (busy_time + idle_time)) if busy_time + idle_time else 0, nodes, steals)
+		if self.worker_times:
+			stats += '\\n'
+		if self.levels:
+			stats += '\\n' + "{0:>5} {1:>12} {2:>12} {3:>12} {4:>12}".format("level", "nodes", "unique", "redundant", "evaluated")
+			for depth, level in enumerate(self.levels):
+				stats += '\\n' + "{0:>5} {1:>12,} {2:>12,} {3:>12,} {4:>12,}".format(depth, level["nodes"], level["unique"], level["redundant"], level["evaluated"])
+			stats += '\\n'
+		if self.cancel_latency is not None:
+			stats += '\\n' + "All workers stopped {0} after the first solution was found\n".format(PatternSolver.format_duration(self.cancel_latency))
+		if self.stream_deltas:
+			stats += '\\n' + "Streamed results: {0:,} nodes in {1:,} deltas\n".format(self.streamed_nodes, self.stream_deltas)
+		if self.seen_set_stats:
+			checks, hits, batches = self.seen_set_stats
+			stats += '\\n' + "Seen set: {0} shards, {1:,} checks in {2:,} batches, {3:,} hits ({4:.1f}%), {5:,} nodes skipped\n".format(self.args.seen_set,
+				checks, batches, hits, (100 * hits / checks) if checks else 0, self.seen_set_skips)
+		if self.gdb_filter is not None:
+			# the false positives are the hashes the filter may have and the DB doesn't, of all hashes not in the DB
+			negatives = self.bloom_checks - (self.bloom_positives - self.bloom_false_positives)
+			stats += '\\n' + "Bloom filter: {0}, {1:,} items, false positive rate {2:.3%} expected, {3:.3%} measured".format(sizeof_fmt(self.gdb_filter.size_in_bytes()),
+				self.gdb_filter.items, self.gdb_filter.get_error_rate(), (self.bloom_false_positives / negatives) if negatives else 0)
+			stats += '\\n' + "  {0:,} lookups, {1:,} sent to the DB, {2:,} false positives\\n".format(self.bloom_checks, self.bloom_positives, self.bloom_false_positives)
+		if self.db_adaptor:
+			# the counters of this process and of the workers
+			db_counters = self.db_adaptor.get_counters()
+			for counter, value in self.db_counters.items():
+				db_counters[counter] = db_counters.get(counter, 0) + value
+			stats += '\\n' + "DB ({0}): {1:,} connections opened".format(self.args.db_backend, int(db_counters.get('connections', 0)))
+			for name in ('gs_does_hash_exist', 'gs_get_children', 'gs_get_nodes', 'rtq_insert_set', 'rtq_get_set'):
+				calls = int(db_counters.get(name + '_calls', 0))
+				if calls:
+					stats += '\\n' + "  {0}: {1:,} calls, {2:.3f} ms average".format(name, calls, 1000 * db_counters[name + '_time'] / calls)
+			stats += '\\n'
 		# Only include detailed stats and gdb info if gdb is used
 		if not self.args.no_stats:
 			stats += "\\n" + "redundant subtrees: {0}".format(self.redundants)
 			stats += "\\n" + "    redundant hits: {0}\\n".format(self.redundant_hits)
 			if self.args.use_global_db:
 				stats += "\\n" + "Number of nodes found in gdb: {0}".format(self.nodes_found_in_gdb)
+			if self.args.propagate:
+				stats += "\\n" + "  propagated nodes: {0}".format(self.propagated_nodes)
+				stats += "\\n" + "  forced variables: {0}".format(self.forced_vars)
+			if self.args.decompose:
+				stats += "\\n" + "  decomposed nodes: {0} into {1} components".format(self.decomposed_nodes, self.components)
+				stats += "\\n" + "  component cache hits: {0}, not satisfiable node hits: {1}".format(self.component_cache_hits, self.unsat_hits)
 			stats += "\n"  # Add a new line at the end for formatting
 
 		# draw graph
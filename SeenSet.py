@@ -0,0 +1,87 @@
+#	SeenSet.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# The ids of the nodes taken by the workers of a solve, shared by all workers. A node is claimed by the first worker that
+# asks for it, the other workers skip it, so no subtree is expanded by two workers.
+# The ids are split over a number of shard actors by their first bytes, every batch of ids is sent to all shards at once.
+# The shards don't reserve a CPU, they only run between the tasks of the workers.
+
+import ray
+from configs import *
+
+@ray.remote(num_cpus=0)
+class SeenSetShard:
+
+	def __init__(self):
+		self.ids = set()
+		self.checks = self.hits = self.batches = 0
+
+	# returns the ids that were already claimed, the others are claimed now
+	def claim(self, ids):
+		seen = [node_id for node_id in ids if node_id in self.ids]
+		self.ids.update(ids)
+		self.checks += len(ids)
+		self.hits += len(seen)
+		self.batches += 1
+		return seen
+
+	# claim the ids without checking them
+	def add(self, ids):
+		self.ids.update(ids)
+
+	def get_stats(self):
+		return self.checks, self.hits, self.batches
+
+
+class SeenSet:
+
+	def __init__(self, shards):
+		self.shards = [SeenSetShard.remote() for _ in range(shards)]
+
+	def size(self):
+		return len(self.shards)
+
+	def split(self, ids):
+		parts = [[] for _ in self.shards]
+		for node_id in ids:
+			parts[int.from_bytes(node_id[:4], 'little') % len(self.shards)].append(node_id)
+		return parts
+
+	# returns the set of ids claimed before by anyone, the others are claimed now
+	def claim(self, ids):
+		tasks = [shard.claim.remote(part) for shard, part in zip(self.shards, self.split(ids)) if part]
+		return set(node_id for seen in ray.get(tasks) for node_id in seen)
+
+	# claim the ids without waiting
+	def add(self, ids):
+		for shard, part in zip(self.shards, self.split(ids)):
+			if part:
+				shard.add.remote(part)
+
+	# returns the number of checked ids, the number of ids that were claimed before, and the number of batches
+	def get_stats(self):
+		stats = ray.get([shard.get_stats.remote() for shard in self.shards])
+		return tuple(sum(values) for values in zip(*stats))
+
+	def shutdown(self):
+		for shard in self.shards:
+			ray.kill(shard)
+		self.shards = []
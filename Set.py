@@ -19,14 +19,32 @@
 #	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
 #
 
+import sys
 import hashlib
 import ast
+from array import array
+from itertools import accumulate, chain
 from configs import *
 from Clause import *
+from Normalizer import Normalizer
 import functools 
 
+# xxhash is optional, it's only used by the 'fast' hash method. blake2b with a 128-bit digest is used if it's not installed.
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
 class Set:
-    
+
+    # the method used to hash all sets, one of HASH_SHA1, HASH_FAST or HASH_TEXT
+    hash_method = HASH_SHA1
+
+    # keep an index of the clauses every literal occurs in, so evaluate() only visits the clauses of the pivot
+    use_occurrences = False
+
+    # the strategy to choose the variable every set is branched on, one of the PIVOT_* strategies
+    pivot_method = PIVOT_LEFTMOST
 
     def __init__(self, str_input=None, id=0, properties=None):
 
@@ -38,6 +56,11 @@ class Set:
         self.evaluated_vars = {}
         self.original_values = {}
         self.highest_occurring_var = 1
+        self.lo_rounds = 0
+        # literal -> positions of the clauses it occurs in, built by to_lo_condition() if use_occurrences is set
+        self.occurrences = None
+        # the variable to branch on, chosen by to_lo_condition() or get_pivot()
+        self.pivot = None
 
         # create a Set object from input string
         if str_input:
@@ -145,19 +168,17 @@ class Set:
 
         # if cl == True, then it has no meaning to add it
 
+    def clauses_count(self):
+        return len(self.clauses)
+
     def sort_within_clauses(self):
         for i in range(0, len(self.clauses)):
             self.clauses[i].sort()
 
     def sort_clauses(self):
-        #self.clauses = sorted(self.clauses)
-
-        def sort_by_var(cl):
-            return abs(cl.raw[0])
-
+        # same order as Clause.__lt__, see Clause.get_sort_key()
         if len(self.clauses) > 0 and len(self.clauses[0].raw) > 0:
-            self.clauses.sort()
-        #self.clauses.sort()
+            self.clauses.sort(key=Clause.get_sort_key)
 
     def rename_vars(self):
         # start from 1
@@ -165,18 +186,23 @@ class Set:
         names_map = {}
         # keep track of the highest occurring var
         highest_occurring_vars_map = {}  
+        # clauses may be shared with other sets, so renamed clauses are new objects
+        clauses = []
         for cl in self.clauses:
-            for i in range(0, len(cl.raw)):
-                sign = -1 if cl.raw[i] < 0 else 1
-                new = names_map.get(abs(cl.raw[i]), None)
+            raw = []
+            for v in cl.raw:
+                sign = -1 if v < 0 else 1
+                new = names_map.get(abs(v), None)
                 if new == None:
                     new = id
-                    names_map[abs(cl.raw[i])] = new
+                    names_map[abs(v)] = new
                     id = id + 1
                     
-                cl.raw[i] = new * sign
+                raw.append(new * sign)
                 # calculate highest occurance var (should we count abs value?)
-                highest_occurring_vars_map[cl.raw[i]] = highest_occurring_vars_map.get(cl.raw[i], 0) + 1
+                highest_occurring_vars_map[raw[-1]] = highest_occurring_vars_map.get(raw[-1], 0) + 1
+            clauses.append(cl.with_raw(raw))
+        self.clauses = clauses
         
         self.highest_occurring_var = max(highest_occurring_vars_map, key=highest_occurring_vars_map.get)
         var_positions = list(names_map.keys())
@@ -263,9 +289,33 @@ class Set:
     def sort_clauses_by_len_and_initial_index(self):
         self.clauses.sort(key=lambda cl: (len(cl.raw), cl.initial_index))
 
-    # convert to L.O. condition
+    # convert to L.O. condition, returns the number of rename rounds it took
     def to_lo_condition(self, mode=MODE_LO, sort_by_size=False, thief_method=False):
-        
+        normalizer = Normalizer(mode, sort_by_size, thief_method, self.pivot_method)
+        order, clauses, self.final_names_map, self.highest_occurring_var, self.lo_rounds, self.pivot = normalizer.normalize(
+            [Normalizer.encode(cl.raw) for cl in self.clauses], [cl.initial_index for cl in self.clauses], self.final_names_map)
+
+        # new clause objects, the old ones may be shared with other sets
+        self.clauses = [self.clauses[pos].with_raw(Normalizer.decode(clause)) for pos, clause in zip(order, clauses)]
+
+        self.occurrences = None
+        if self.use_occurrences:
+            self.build_occurrences()
+
+        return self.lo_rounds
+
+    def build_occurrences(self):
+        occurrences = {}
+        for pos, cl in enumerate(self.clauses):
+            for v in cl.raw:
+                occurrences.setdefault(v, []).append(pos)
+        self.occurrences = occurrences
+
+    # the rename/check/sort loop that to_lo_condition() replaced, kept as a reference for tools/bench_lo_condition.py
+    def to_lo_condition_iterative(self, mode=MODE_LO, sort_by_size=False, thief_method=False):
+        self.occurrences = None
+        self.pivot = None
+
         # used in Thief method, sort by length,initial index
         if thief_method:
             self.sort_clauses_by_len_and_initial_index()
@@ -277,6 +327,7 @@ class Set:
 
         # rename
         self.rename_vars()
+        self.lo_rounds = 1
         # check L.O. conditions
         while not self.is_in_lo_state(mode):
             # condition 2
@@ -287,11 +338,16 @@ class Set:
 
             # rename
             self.rename_vars()
-            
+            self.lo_rounds += 1
+
+        return self.lo_rounds
+
 
     # substitue the value of a var or more in the set.
     # vars map is a map of var name and value, such as {1: True, 2: False, 6: True}
     def substitute_vars(self, vars_map):
+        self.occurrences = None
+        self.pivot = None
         vars = set(vars_map.keys())
         i = 0
         while i < len(self.clauses):
@@ -305,6 +361,8 @@ class Set:
                 continue
 
             cl_popped = False
+            # the clause may be shared with other sets, change a copy of it
+            cl = self.clauses[i] = cl.with_raw(list(cl.raw))
             clraw = list(cl.raw) # object copy
             for v in clraw:
                 # if the clause evaluates to True, remove it
@@ -322,6 +380,15 @@ class Set:
             if not cl_popped:
                 i += 1
 
+    # the variable to branch on by pivot_method. It's chosen by to_lo_condition(), sets that didn't go through it (e.g.
+    # sets read from the runtime DB) choose it here from their clauses
+    def get_pivot(self):
+        if self.pivot == None:
+            if self.pivot_method == PIVOT_LEFTMOST:
+                return abs(self.clauses[0].raw[0])
+            self.pivot = Normalizer(pivot_method=self.pivot_method).choose_pivot([Normalizer.encode(cl.raw) for cl in self.clauses])
+        return self.pivot
+
     # evaluate the set and produce two branches
     def evaluate(self):
 
@@ -329,30 +396,29 @@ class Set:
         if len(self.clauses) <= 0 or len(self.clauses[0].raw) <= 0: 
             return (None, None)
 
-        # always pick the left most variable and evaluate based on it.
-        pivot = abs(self.clauses[0].raw[0])
-        #pivot = self.highest_occurring_var
+        # pick the variable to evaluate based on it, the left most one by default
+        pivot = self.get_pivot()
+
+        if self.use_occurrences:
+            return self.evaluate_with_occurrences(pivot)
 
         # Left Set: iterate through clauses, for each clause check if it has pivot, set it to True. If it has -pivot, remove the variable from the set
         # Right Set: opposite of left
         left_set = Set()
         right_set = Set()
 
+        # clauses are never changed in place (copy on write): a clause without the pivot is shared by the parent and both
+        # children, a new clause is only created when the pivot is removed from it
         left_clauses = []
         right_clauses = []
-        for c in self.clauses:
-            cl = Clause(c.raw)
-            cl.initial_index = c.initial_index
+        for cl in self.clauses:
             # remove clause, i.e. set the var to true
             if pivot in cl.raw:
                 # for left branch, the clause will be set to true. i.e. removed. (will not be added to left_clauses)
                 
                 # for right branch, remove the var from the clause
-                cl.raw.pop(cl.raw.index(pivot))
-                if len(cl.raw) > 0:
-                    #ncl = Clause(cl.raw)
-                    cl.substituted = True
-                    right_clauses.append(cl)
+                if len(cl.raw) > 1:
+                    right_clauses.append(cl.with_raw([v for v in cl.raw if v != pivot], substituted=True))
                 # if it's the last variable, then the clause will be evaluated to False, then all the Set will be False
                 else:
                     right_set.set_value(False)
@@ -361,18 +427,17 @@ class Set:
                 # for right branch, the clause will be set to true. i.e. removed.
 
                 # for left branch, remove the var from the clause
-                cl.raw.pop(cl.raw.index(-pivot))
-                if len(cl.raw) > 0:
-                    cl.substituted = True
-                    left_clauses.append(cl)
+                if len(cl.raw) > 1:
+                    left_clauses.append(cl.with_raw([v for v in cl.raw if v != -pivot], substituted=True))
                 # if it's the last variable, then the clause will be evaluated to False
                 else:
                     left_set.set_value(False)
 
             else:
-                lcl = Clause(cl.raw)
-                lcl.initial_index = c.initial_index
-                left_clauses.append(lcl)
+                # only the clauses changed by this evaluation are flagged as substituted
+                if cl.substituted:
+                    cl = cl.with_raw(cl.raw, substituted=False)
+                left_clauses.append(cl)
                 right_clauses.append(cl)
         
         
@@ -396,6 +461,166 @@ class Set:
 
         return (left_set, right_set)
 
+    # unit propagation, and pure literal elimination if pure_literals is set, on a child right after evaluate() and
+    # before it's renamed. Every forced variable saves a node that would have only one non False child, its value is
+    # recorded in evaluated_vars so the solution stays complete. Returns the number of forced variables
+    def propagate(self, pure_literals=False):
+        if self.value != None:
+            return 0
+
+        clauses = self.clauses
+        forced = {}
+        while self.value == None:
+            # literals of the unit clauses are set to True
+            assignment = {cl.raw[0]:True for cl in clauses if len(cl.raw) == 1}
+
+            # if there's no unit clause, set the literals appearing with only one sign to True
+            if not assignment and pure_literals:
+                literals = {v for cl in clauses for v in cl.raw}
+                assignment = {v:True for v in literals if -v not in literals}
+
+            if not assignment:
+                break
+
+            # two unit clauses of the same variable with different signs
+            if any(-v in assignment for v in assignment):
+                self.set_value(False)
+                break
+
+            forced.update(assignment)
+            new_clauses = []
+            for cl in clauses:
+                # the clause is True, remove it
+                if any(v in assignment for v in cl.raw):
+                    continue
+
+                # remove the False literals from the clause, copy on write as in evaluate()
+                if any(-v in assignment for v in cl.raw):
+                    raw = [v for v in cl.raw if -v not in assignment]
+                    if len(raw) == 0:
+                        self.set_value(False)
+                        break
+                    cl = cl.with_raw(raw, substituted=True)
+                new_clauses.append(cl)
+
+            clauses = new_clauses
+            if len(clauses) == 0 and self.value == None:
+                self.set_value(True)
+
+        if not forced:
+            return 0
+
+        self.clauses = clauses
+        self.evaluated_vars.update({self.original_values[abs(v)]:v > 0 for v in forced})
+        self.original_values = {v:self.original_values[v] for v in self.get_variables()}
+        self.computed_hash = None
+        self.occurrences = None
+        self.pivot = None
+        return len(forced)
+
+    # split the set into sets of variable-disjoint clauses, in the order of their first clause. The parts keep the
+    # original_values of their variables, evaluated_vars are not copied. Returns [self] if the set doesn't split
+    def split_components(self):
+        if self.value != None:
+            return [self]
+
+        # union-find of the variables, every clause joins its variables to the root of its first one
+        roots = {}
+        def find(v):
+            while roots.setdefault(v, v) != v:
+                roots[v] = roots[roots[v]]
+                v = roots[v]
+            return v
+
+        clauses = self.clauses
+        for cl in clauses:
+            root = find(abs(cl.raw[0]))
+            for v in cl.raw[1:]:
+                other = find(abs(v))
+                if other != root:
+                    roots[other] = root
+
+        groups = {}
+        for cl in clauses:
+            groups.setdefault(find(abs(cl.raw[0])), []).append(cl)
+
+        if len(groups) == 1:
+            return [self]
+
+        components = []
+        for group in groups.values():
+            component = type(self)()
+            component.clauses = group
+            component.original_values = {v:self.original_values[v] for v in component.get_variables()}
+            component.final_names_map = list(self.final_names_map)
+            components.append(component)
+        return components
+
+    # same as evaluate(), but only the clauses containing the pivot are searched for it, using the occurrences index.
+    # The other clauses are shared, and as in evaluate() the ones flagged as substituted are replaced by unflagged copies
+    def evaluate_with_occurrences(self, pivot):
+        if self.occurrences == None:
+            self.build_occurrences()
+
+        occurrences = self.occurrences
+        clauses = [cl.with_raw(cl.raw, substituted=False) if cl.substituted else cl for cl in self.clauses]
+        left_set = Set()
+        right_set = Set()
+
+        # clauses set to true in the left set, and in the right set
+        left_true = set(occurrences.get(pivot, []))
+        right_true = set(occurrences.get(-pivot, []))
+
+        left_clauses = []
+        right_clauses = []
+        start = 0
+        for pos in sorted(left_true | right_true):
+            # untouched clauses since the last clause containing the pivot
+            left_clauses += clauses[start:pos]
+            right_clauses += clauses[start:pos]
+            start = pos + 1
+
+            # remove the var from the clause, if it's the last variable, then the set will be False
+            cl = clauses[pos]
+            if pos in left_true:
+                raw = [v for v in cl.raw if v != pivot]
+                if raw:
+                    right_clauses.append(cl.with_raw(raw, substituted=True))
+                else:
+                    right_set.set_value(False)
+            else:
+                raw = [v for v in cl.raw if v != -pivot]
+                if raw:
+                    left_clauses.append(cl.with_raw(raw, substituted=True))
+                else:
+                    left_set.set_value(False)
+
+        left_clauses += clauses[start:]
+        right_clauses += clauses[start:]
+
+        left_set.clauses = left_clauses
+        right_set.clauses = right_clauses
+
+        for sset in (left_set, right_set):
+            if len(sset.clauses) == 0 and sset.value == None:
+                sset.set_value(True)
+
+        # set a map to the original variables in each set. A variable is gone from a set only if all the clauses it
+        # occurs in are set to true in it, so only the variables of these clauses are checked
+        vars = sorted(set(map(abs, occurrences)))
+        for sset, removed in ((left_set, left_true), (right_set, right_true)):
+            gone = {pivot}
+            for pos in removed:
+                for v in clauses[pos].raw:
+                    if abs(v) not in gone and all(p in removed for p in occurrences.get(v, []) + occurrences.get(-v, [])):
+                        gone.add(abs(v))
+            sset.original_values = {v:self.original_values[self.final_names_map[v-1]] for v in vars if v not in gone}
+
+        left_set.evaluated_vars = {**self.evaluated_vars, self.original_values[self.final_names_map[pivot-1]]:True}
+        right_set.evaluated_vars = {**self.evaluated_vars, self.original_values[self.final_names_map[pivot-1]]:False}
+
+        return (left_set, right_set)
+
 
     def to_string(self, pretty=True, only_evaluated_clauses=False):
 
@@ -435,14 +660,41 @@ class Set:
 
         return list(vars)
 
+    # canonical binary form of the set: number of clauses, end offset of every clause and then all literals, packed as
+    # little-endian 32-bit integers on every machine. A set with a value is encoded as b'T' or b'F', which can't collide
+    # with a packed set.
+    def get_encoding(self):
+        if self.value != None:
+            return str(self.value)[0].encode()
+
+        raws = [cl.raw for cl in self.clauses]
+        packed = [len(raws)]
+        packed.extend(accumulate(map(len, raws)))
+        packed.extend(chain.from_iterable(raws))
+        packed = array('i', packed)
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        return packed.tobytes()
+
     @staticmethod
     def calculate_hash(input_str):
         # sha1 hash
         return hashlib.sha1(bytes(input_str, "ascii")).digest() 
-        
+
+    @staticmethod
+    def hash_bytes(data):
+        if Set.hash_method == HASH_FAST:
+            if xxhash:
+                return xxhash.xxh3_128_digest(data)
+            return hashlib.blake2b(data, digest_size=16).digest()
+        return hashlib.sha1(data).digest()
+
     def get_hash(self, force_recalculate=False):
         if self.computed_hash == None or force_recalculate:
-            self.computed_hash = Set.calculate_hash(self.to_string(pretty=False))
+            if Set.hash_method == HASH_TEXT:
+                self.computed_hash = Set.calculate_hash(self.to_string(pretty=False))
+            else:
+                self.computed_hash = Set.hash_bytes(self.get_encoding())
         return self.computed_hash
 
     def print_set(self):
@@ -450,8 +702,8 @@ class Set:
     
     @staticmethod
     def get_true_set_hash():
-        return Set.calculate_hash('T')
+        return Set.hash_bytes(b'T')
     
     @staticmethod
     def get_false_set_hash():
-        return Set.calculate_hash('F')
+        return Set.hash_bytes(b'F')
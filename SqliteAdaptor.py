@@ -0,0 +1,324 @@
+#	SqliteAdaptor.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# The global sets table and the runtime queues in an SQLite file, with the same gs_* and rtq_* methods as DbAdapter,
+# so single machine runs keep their nodes from run to run without a PostgreSQL server.
+# The file is in WAL mode: the workers of the local backend read while one of them writes, and a commit doesn't wait
+# for the disk. The tables are keyed by the hash, without rowids, so a lookup is one B-tree search in the file.
+# The writes to the global sets table are buffered (see BufferedDbAdapter in DbBackends.py), a batch is written in one
+# transaction. Every process opens its own connection, a forked worker or an unpickled SqliteAdapter reconnects.
+
+import os
+import json
+import time
+import sqlite3
+from collections import defaultdict
+from configs import *
+from DbBackends import BufferedDbAdapter
+
+# connections opened, and the calls and seconds of the hot queries of this process
+counters = defaultdict(float)
+
+class SqliteAdapter(BufferedDbAdapter):
+
+    def __init__(self, db_file=DB_FILE, batch_size=GDB_BATCH_ROWS):
+        self.db_file = db_file
+        super().__init__(batch_size)
+
+    def connect(self):
+        self.pid = os.getpid()
+        self.conn = sqlite3.connect(self.db_file, timeout=SQLITE_TIMEOUT)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.cur = self.conn.cursor()
+        counters['connections'] += 1
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    # the mapping is kept as JSON
+    def encode_mapping(self, mapping):
+        return json.dumps(mapping)
+
+    def get_counters(self):
+        return dict(counters)
+
+    # run a hot query and count its calls and time
+    def execute_counted(self, name, query, params):
+        start_time = time.perf_counter()
+        self.cur.execute(query, params)
+        counters[name + '_calls'] += 1
+        counters[name + '_time'] += time.perf_counter() - start_time
+
+    ### GlobalSetsTable methods ###
+
+    def gs_create_table(self, table_name):
+        table_command = """
+                CREATE TABLE IF NOT EXISTS "{0}" (
+                hash BLOB PRIMARY KEY,
+                body TEXT,
+                cid1 BLOB,
+                cid2 BLOB,
+                mapping TEXT,
+                num_of_clauses INTEGER DEFAULT 0,
+                num_of_vars INTEGER DEFAULT 0,
+                unique_nodes INTEGER DEFAULT 0,
+                redundant_nodes INTEGER DEFAULT 0,
+                redundant_hits INTEGER DEFAULT 0,
+                redundant_times INTEGER DEFAULT 0,
+                date_created TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            ) WITHOUT ROWID
+            """.format(table_name)
+        index_commands = [
+                'CREATE INDEX IF NOT EXISTS "{0}_num_clauses" ON "{0}" (num_of_clauses)'.format(table_name),
+                'CREATE INDEX IF NOT EXISTS "{0}_unique_nodes" ON "{0}" (unique_nodes)'.format(table_name),
+            ]
+
+        try:
+            self.cur.execute(table_command)
+            for index_command in index_commands:
+                self.cur.execute(index_command)
+            self.conn.commit()
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+
+    # write a batch of rows in one transaction, returns the set of the hashes inserted, or None on error
+    def write_rows(self, table_name, rows):
+        inserted = set()
+        try:
+            for row in rows.values():
+                self.cur.execute('INSERT OR IGNORE INTO "{0}"(hash, body, cid1, cid2, mapping, num_of_clauses, num_of_vars) VALUES(?, ?, ?, ?, ?, ?, ?)'.format(table_name), row)
+                if self.cur.rowcount:
+                    inserted.add(row[0])
+            self.conn.commit()
+        except sqlite3.Error as error:
+            self.conn.rollback()
+            logger.error("DB Error: " + str(error))
+            return None
+
+        return inserted
+
+    def gs_does_hash_exist(self, table_name, value):
+        if value in self.pending_rows.get(table_name, {}):
+            return True
+        result = False
+        try:
+            self.execute_counted("gs_does_hash_exist", 'SELECT 1 FROM "{0}" WHERE hash = ? LIMIT 1'.format(table_name), (value, ))
+            result = self.cur.fetchone() is not None
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+
+        return result
+
+    # a solved set has unique_nodes greater than zero
+    def gs_is_hash_solved(self, table_name, value):
+        if value in self.pending_counts.get(table_name, {}):
+            return bool(self.pending_counts[table_name][value][1])
+        result = False
+        try:
+            self.cur.execute('SELECT unique_nodes FROM "{0}" WHERE hash = ?'.format(table_name), (value, ))
+            row = self.cur.fetchone()
+            if row:
+                result = bool(row['unique_nodes'])
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+        return result
+
+    # write a batch of counts and redundant times in one transaction, returns False on error
+    def write_counts(self, table_name, counts, times):
+        result = False
+        try:
+            self.cur.executemany('UPDATE "{0}" SET unique_nodes = ?, redundant_nodes = ?, redundant_hits = ? WHERE hash = ?'.format(table_name),
+                ((unique_nodes, redundant_nodes, redundant_hits, hash) for hash, unique_nodes, redundant_nodes, redundant_hits in counts.values()))
+            self.cur.executemany('UPDATE "{0}" SET redundant_times = redundant_times + ? WHERE hash = ?'.format(table_name),
+                ((redundant_times, hash) for hash, redundant_times in times.items()))
+            self.conn.commit()
+            result = True
+        except sqlite3.Error as error:
+            self.conn.rollback()
+            logger.error("DB Error: " + str(error))
+
+        return result
+
+    # load only solved sets (only solved sets have unique_nodes > 0)
+    def gs_load_solved_sets(self, table_name, num_clauses):
+        result = []
+        try:
+            self.cur.execute('SELECT hash, unique_nodes, redundant_nodes FROM "{0}" WHERE num_of_clauses <= ? AND unique_nodes > 0'.format(table_name), (num_clauses, ))
+            result = [[bytes(row[0]), row[1], row[2]] for row in self.cur.fetchall()]
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+
+        return result
+
+    def gs_count_rows(self, table_name):
+        result = 0
+        try:
+            self.cur.execute('SELECT count(*) FROM "{0}"'.format(table_name))
+            result = self.cur.fetchone()[0]
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+
+        return result
+
+    # yield the hashes of all rows in lists of batch_size
+    def gs_iterate_hashes(self, table_name):
+        try:
+            cur = self.conn.execute('SELECT hash FROM "{0}"'.format(table_name))
+            while True:
+                rows = cur.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                yield [bytes(row[0]) for row in rows]
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+
+    # load only unsolved sets (only unsolved sets have unique_nodes = 0)
+    def gs_load_unsolved_sets(self, table_name, num_clauses):
+        result = []
+        try:
+            self.cur.execute('SELECT hash FROM "{0}" WHERE num_of_clauses <= ? AND unique_nodes = 0'.format(table_name), (num_clauses, ))
+            result = [bytes(row[0]) for row in self.cur.fetchall()]
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+
+        return result
+
+    def gs_get_set_data(self, table_name, set_hash):
+        # a buffered row is written first, the caller gets all of its columns
+        if set_hash in self.pending_rows.get(table_name, {}) or set_hash in self.pending_counts.get(table_name, {}):
+            self.gs_flush_counts(table_name)
+        result = None
+        try:
+            self.cur.execute('SELECT * FROM "{0}" WHERE hash = ?'.format(table_name), (set_hash, ))
+            result = self.cur.fetchone()
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+
+        return result
+
+    def gs_get_children(self, table_name, set_hash):
+        if set_hash in self.pending_rows.get(table_name, {}):
+            row = self.pending_rows[table_name][set_hash]
+            return (row[2], row[3])
+        result = (None, None)
+        try:
+            self.execute_counted("gs_get_children", 'SELECT cid1, cid2 FROM "{0}" WHERE hash = ?'.format(table_name), (set_hash, ))
+            row = self.cur.fetchone()
+            if row and row['cid1'] is not None and row['cid2'] is not None:
+                result = (bytes(row['cid1']), bytes(row['cid2']))
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+
+        return result
+
+    # existence, children and bodies of the children of a list of hashes, in one query per SQLITE_MAX_PARAMS hashes.
+    # Returns a dict of the hashes found: their cid1, cid2 and the bodies of both children, None for a child that isn't
+    # in the table
+    def gs_get_nodes(self, table_name, hashes):
+        result = {}
+        pending = self.pending_rows.get(table_name, {})
+        try:
+            query_hashes = [hash for hash in hashes if hash not in pending]
+            for start in range(0, len(query_hashes), SQLITE_MAX_PARAMS):
+                chunk = query_hashes[start:start + SQLITE_MAX_PARAMS]
+                self.execute_counted("gs_get_nodes", """
+                        SELECT node.hash, node.cid1, node.cid2, child1.body, child2.body FROM "{0}" node
+                        LEFT JOIN "{0}" child1 ON child1.hash = node.cid1
+                        LEFT JOIN "{0}" child2 ON child2.hash = node.cid2
+                        WHERE node.hash IN ({1})
+                    """.format(table_name, ", ".join("?" * len(chunk))), chunk)
+                for row in self.cur.fetchall():
+                    result[bytes(row[0])] = (row[1], row[2], row[3], row[4])
+
+            # the buffered rows and their children, rarely asked for
+            for hash in hashes:
+                if hash in pending:
+                    children = pending[hash][2:4]
+                    bodies = []
+                    for child in children:
+                        set_data = pending.get(child) or self.gs_get_set_data(table_name, child)
+                        bodies.append(set_data[1] if child in pending else (set_data['body'] if set_data else None))
+                    result[hash] = tuple(children) + tuple(bodies)
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+
+        return result
+
+    # drop all global db tables
+    def gs_drop_all(self):
+        for table_name in ["globalsetstable_lou", "globalsetstable_lo", "globalsetstable_flo", "globalsetstable_flop"]:
+            self.gs_drop_table(table_name)
+
+    def gs_drop_table(self, table_name):
+        try:
+            self.cur.execute('DROP TABLE IF EXISTS "{0}"'.format(table_name))
+            self.conn.commit()
+            print(f"Table {table_name} is deleted.")
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+
+    ### RunTimeQueue methods ###
+
+    def rtq_create_table(self, table_name):
+        try:
+            self.cur.execute('CREATE TABLE "{0}" (id BLOB PRIMARY KEY, body TEXT, properties TEXT DEFAULT NULL) WITHOUT ROWID'.format(table_name))
+            self.conn.commit()
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+            return False
+
+        return True
+
+    # a key violation is ignored as in DbAdapter
+    def rtq_insert_set(self, table_name, id, body, properties):
+        try:
+            self.execute_counted("rtq_insert_set", 'INSERT OR IGNORE INTO "{0}"(id, body, properties) VALUES(?, ?, ?)'.format(table_name), (id, body, properties))
+            self.conn.commit()
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+            self.conn.rollback()
+
+        return True
+
+    def rtq_get_set(self, table_name, id):
+        result = None
+        try:
+            self.execute_counted("rtq_get_set", 'SELECT id, body, properties FROM "{0}" WHERE id = ? LIMIT 1'.format(table_name), (id, ))
+            row = self.cur.fetchone()
+            result = (bytes(row['id']), row['body'], row['properties'])
+        except (sqlite3.Error, TypeError) as error:
+            logger.error("DB Error: " + str(error))
+
+        return result
+
+    def rtq_cleanup(self, table_name):
+        success = False
+        try:
+            self.cur.execute('DROP TABLE "{0}"'.format(table_name))
+            self.conn.commit()
+            success = True
+        except sqlite3.Error as error:
+            logger.error("DB Error: " + str(error))
+
+        return success
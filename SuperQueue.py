@@ -23,8 +23,8 @@ import hashlib
 import re
 import time
 import Set
-from DbAdaptor import DbAdapter
-from configs import PROBLEM_ID
+from configs import PROBLEM_ID, DB_POSTGRES, DB_FILE
+from itertools import islice
 from collections import deque
 from collections import OrderedDict
 from ordered_set import OrderedSet
@@ -39,9 +39,11 @@ class SuperQueue:
     db = None
     use_runtime_db = False
 
-    def __init__(self, name="", unique_queue=False, use_runtime_db=False, problem_id=PROBLEM_ID):
+    def __init__(self, name="", unique_queue=False, use_runtime_db=False, problem_id=PROBLEM_ID, set_class=Set.Set, db_backend=DB_POSTGRES, db_file=DB_FILE):
 
         self.unique_queue = unique_queue
+        # class of the objects rebuilt from the database, i.e. Set or CompactSet
+        self.set_class = set_class
         if unique_queue:
             self.objqueue = OrderedSet()
             self.idsqueue = OrderedSet()   # queue of objects ids
@@ -51,8 +53,13 @@ class SuperQueue:
 
         self.table_name = "queue_" + hashlib.sha224("{}_{}_{}".format(re.sub(r'[\(\)\{\}# ]', '', name), problem_id, str(time.time()).replace(".", "")).encode()).hexdigest()
         self.use_runtime_db = use_runtime_db
+        # storage backend of the queue, see DbBackends.py
+        self.db_backend = db_backend
+        self.db_file = db_file
         if use_runtime_db:
-            self.db = DbAdapter()
+            # psycopg2 is only imported when the queue is kept in the database
+            import DbBackends
+            self.db = DbBackends.create_db_adapter(db_backend, db_file)
             self.db.rtq_create_table(self.table_name)
 
 
@@ -86,7 +93,7 @@ class SuperQueue:
             else:
                 objid = self.idsqueue.popleft()
             id, body, properties = self.db.rtq_get_set(self.table_name, objid)
-            item = Set.Set(body, properties=properties)
+            item = self.set_class(body, properties=properties)
             item.id = id
 
         elif self.unique_queue:
@@ -97,6 +104,12 @@ class SuperQueue:
 
         return item
 
+    # ids of the next count items, without popping them
+    def peek_ids(self, count):
+        if self.use_runtime_db:
+            return list(islice(self.idsqueue, count))
+        return [item.id for item in islice(self.objqueue, count)]
+
     def size(self):
         size = 0
         if self.use_runtime_db:
@@ -111,7 +124,8 @@ class SuperQueue:
 
     def relink_db(self):
         if self.use_runtime_db:
-            self.db = DbAdapter()
+            import DbBackends
+            self.db = DbBackends.create_db_adapter(self.db_backend, self.db_file)
 
     def unlink_db(self):
         self.db = None
@@ -0,0 +1,80 @@
+#	WorkCoordinator.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# Coordinator of work stealing between the workers of a pool.
+# A busy worker can't answer a request while it expands nodes, so the part of its queue other workers can steal is kept
+# here: a deque per worker. A busy worker checks every few nodes whether other workers are waiting, and if so moves
+# the oldest half of its queue to its deque, those are the nodes closest to the root, i.e. the biggest subtrees.
+# An idle worker takes the nodes of its own deque first, otherwise steals the oldest half of the longest deque.
+# The work is done when all workers are idle and all deques are empty.
+
+from collections import deque
+import ray
+from configs import *
+
+@ray.remote(num_cpus=0)
+class WorkCoordinator:
+
+	def __init__(self, workers):
+		self.deques = [deque() for _ in range(workers)]
+		self.idle_workers = set(range(workers))
+		self.steals = [0] * workers
+		self.stopped = False
+
+	def donate(self, worker, nodes):
+		self.deques[worker].extend(nodes)
+
+	# returns the number of workers waiting for nodes, None if the work is stopped
+	def sync(self):
+		if self.stopped:
+			return None
+		return len(self.idle_workers)
+
+	# returns nodes for the worker, an empty list if it has to wait, or None when all the work is done
+	def steal(self, worker):
+		if self.stopped:
+			return None
+
+		victim = worker if self.deques[worker] else max(range(len(self.deques)), key=lambda i: len(self.deques[i]))
+		victim_deque = self.deques[victim]
+		if victim_deque:
+			count = len(victim_deque) if victim == worker else max(1, len(victim_deque) // 2)
+			nodes = [victim_deque.popleft() for i in range(count)]
+			if victim != worker:
+				self.steals[worker] += 1
+			self.idle_workers.discard(worker)
+			return nodes
+
+		self.idle_workers.add(worker)
+		if len(self.idle_workers) == len(self.deques):
+			return None
+		return []
+
+	# a worker that can't process nodes leaves its nodes to the other workers and doesn't steal anymore, it counts as idle
+	def leave(self, worker, nodes):
+		self.deques[worker].extend(nodes)
+		self.idle_workers.add(worker)
+
+	def stop(self):
+		self.stopped = True
+
+	def get_steals(self):
+		return self.steals
@@ -0,0 +1,102 @@
+#	WorkerPool.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# A pool of long-lived Ray actors, created once per solve. Every worker gets its own copy of a PatternSolver when it
+# starts, and runs tasks (calls of a method of this solver) one at a time. The solver lives between tasks, so its
+# caches stay warm and no solver is pickled per task.
+# The pool measures the start-up time of the workers, and the compute time of the tasks as measured by the workers.
+
+import time
+import ray
+from configs import *
+
+@ray.remote
+class PoolWorker:
+
+	def __init__(self, pattern_solver):
+		self.pattern_solver = pattern_solver
+		self.pattern_solver.set_node_options()
+
+	def ready(self):
+		return True
+
+	# call a method of the solver, returns its result and the time it took
+	def run(self, method, *args, **kwargs):
+		start_time = time.perf_counter()
+		result = getattr(self.pattern_solver, method)(*args, **kwargs)
+		return result, time.perf_counter() - start_time
+
+
+class WorkerPool:
+
+	def __init__(self, pattern_solver, size):
+		start_time = time.perf_counter()
+		self.workers = [PoolWorker.remote(pattern_solver) for _ in range(size)]
+		ray.get([worker.ready.remote() for worker in self.workers])
+		self.startup_time = time.perf_counter() - start_time
+
+		self.idle_workers = list(self.workers)
+		self.running = {}       # task ObjectRef -> worker
+		self.compute_time = 0
+		self.tasks = 0
+
+	def size(self):
+		return len(self.workers)
+
+	def idle_count(self):
+		return len(self.idle_workers)
+
+	def pending_count(self):
+		return len(self.running)
+
+	# put a value in the object store once, so the tasks that get it don't copy it
+	def put(self, value):
+		return ray.put(value)
+
+	# run a method of the solver on an idle worker, returns the ObjectRef of the task
+	def submit(self, method, *args, **kwargs):
+		worker = self.idle_workers.pop(0)
+		task = worker.run.remote(method, *args, **kwargs)
+		self.running[task] = worker
+		return task
+
+	# wait for the next task to finish, returns its result, or None if no task finished within the timeout
+	def get_next(self, timeout=None):
+		return self.get_next_task(timeout)[1]
+
+	# wait for the next task to finish, returns its ObjectRef and its result
+	def get_next_task(self, timeout=None):
+		done, _ = ray.wait(list(self.running), timeout=timeout)
+		if not done:
+			return None, None
+		task = done[0]
+		self.idle_workers.append(self.running.pop(task))
+		result, compute_time = ray.get(task)
+		self.compute_time += compute_time
+		self.tasks += 1
+		return task, result
+
+	def shutdown(self):
+		for worker in self.workers:
+			ray.kill(worker)
+		self.workers = []
+		self.idle_workers = []
+		self.running = {}
@@ -38,6 +38,15 @@ DB_USER="NAME"
 DB_PASSWORD="PASS"
 GLOBAL_SETS_TABLE_PREFIX = "globalsetstable_"
 GLOBAL_SETS_TABLE = GLOBAL_SETS_TABLE_PREFIX
+GDB_BATCH_ROWS = 1000       # rows written to the global sets table at once
+DB_POOL_SIZE = 4            # idle connections kept by every process
+DB_POSTGRES = "postgres"    # storage backends of the global sets table and the runtime queues, see DbBackends.py
+DB_SQLITE = "sqlite"
+DB_FILE = "ndp.sqlite3"     # file of the sqlite backend
+SQLITE_TIMEOUT = 30         # seconds a connection waits for the lock of another process
+SQLITE_MAX_PARAMS = 500     # hashes looked up in one query of the sqlite backend
+BLOOM_ERROR = 0.01          # false positive rate of the Bloom filter of the global sets table
+BLOOM_MIN_ITEMS = 1 << 20   # items the Bloom filter is sized for at least, the rows of the table are doubled
 
 # constants
 NODE_UNIQUE = 0
@@ -54,6 +63,47 @@ MODE_LOU = "lou"
 MODE_LO = "lo"
 MODE_NORMAL = "normal"
 
+# node hash methods
+HASH_SHA1 = "sha1"      # SHA1 of the packed binary form of the set
+HASH_FAST = "fast"      # 128-bit non-cryptographic hash of the packed binary form (xxh3 if installed)
+HASH_TEXT = "text"      # SHA1 of the text form of the set, as stored in global DB tables filled before the binary form
+
+# pivot strategies, the variable every node is branched on
+PIVOT_LEFTMOST = "leftmost"                 # first variable of the first clause
+PIVOT_MOST_OCCURRING = "most-occurring"     # variable of the literal occurring in most clauses
+PIVOT_SHORTEST_CLAUSE = "shortest-clause"   # first variable of the first shortest clause
+PIVOT_JEROSLOW_WANG = "jw"                  # highest two-sided Jeroslow-Wang score: sum of 2^-len of the clauses of the variable
+
+# propagation of the children after branching
+PROPAGATE_UNITS = "units"   # unit propagation
+PROPAGATE_PURE = "pure"     # unit propagation and pure literal elimination
+
+# backends of the worker pool
+BACKEND_AUTO = "auto"       # ray if a cluster address is given or an option needs ray, otherwise local
+BACKEND_RAY = "ray"         # actors of a Ray cluster
+BACKEND_LOCAL = "local"     # processes of this machine
+
+# engines of the tree
+ENGINE_QUEUE = "queue"      # one node at a time from a queue, subtrees on the workers
+ENGINE_LEVELS = "levels"    # one BFS level at a time, slices of a level on the workers
+LEVEL_SLICE_NODES = 10000   # max nodes of a level expanded at once
+
+# engines of the subgraph stats of every node
+STATS_DAG = "dag"           # one pass over the graph in reverse topological order, see GraphStats.py
+STATS_DFS = "dfs"           # a depth first search from every node, on the workers
+STATS_ROOT = "root"         # the stats of the root alone, from the number of parents of every node
+
+# results streamed by the workers of the pool
+STREAM_BATCH_NODES = 1000   # expanded nodes a worker sends at once
+STREAM_POLL = 0.1           # seconds the main process waits for a task before it merges the streamed results
+
+# nodes a worker expands between checks whether another worker has found a solution, with --exit-upon-solving
+CANCEL_POLL_NODES = 32
+
+# work stealing between the workers of the pool
+STEAL_SYNC_NODES = 16   # nodes a busy worker expands between checks for waiting workers
+STEAL_WAIT = 0.01       # seconds an idle worker waits before it tries to steal again
+
 
 # logging
 #logging.basicConfig(format='%(asctime)s,%(msecs)d %(levelname)-8s [%(filename)s:%(lineno)d %(funcName)s] %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p')
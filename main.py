@@ -22,21 +22,10 @@
 import os, sys
 import time
 import argparse, textwrap
-import ray
 import logging
 
-# Initialize Ray with the current directory as the working directory
-def initialize_ray():
-	if not ray.is_initialized():
-		current_dir = os.path.dirname(os.path.abspath(__file__))
-		# Set Ray's logging level to only show errors
-		ray.init(runtime_env={"working_dir": current_dir}, logging_level=logging.ERROR)
-		cluster_resources = ray.cluster_resources()
-		num_cpus = cluster_resources.get("CPU", 1)  # Defaults to 1 if not available
-		print(f"\n\n\nNDP started.")
-		return cluster_resources, num_cpus
-
-cluster_resources, num_cpus = initialize_ray()
+# resources of the Ray cluster, None if the local backend is used
+cluster_resources = None
 
 from audioop import mul
 from copy import deepcopy
@@ -49,6 +38,7 @@ import configs
 import traceback
 from Factorizer import Factorizer
 from byebye import bye_art
+import Executors
 
 # todo:
 #
@@ -126,7 +116,9 @@ def Main(args):
 		originalCnf = deepcopy(CnfSet)
 		# start processing the root set
 		if len(CnfSet.clauses) > 0 or CnfSet.value != None:
-			PAT = PatternSolver(args=args, problem_id=CnfSet.get_hash().hex(), cluster_resources=cluster_resources, input_file=input_file_name)
+			PAT = PatternSolver(args=args, cluster_resources=cluster_resources, input_file=input_file_name)
+			# the problem id is the hash of the input set with the hash method of the options, which the solver sets
+			PAT.problem_id = CnfSet.get_hash(force_recalculate=True).hex()
 			PAT.solve_set(CnfSet)
 
 			# save solution in a file
@@ -182,8 +174,61 @@ if __name__ == "__main__":
 	parser.add_argument("-rdb", "--use-runtime-db", help="Use database for set lookup in table established only for the current cnf", action="store_true")
 	parser.add_argument("-gdb", "--use-global-db", help="Use database for set lookup in global sets table", action="store_true")
 	parser.add_argument("-gnm", "--gdb-no-mem", help="Don't load hashes from global DB into memory. Only use if gdb gets huge and doesn't fit memory. (slower)", action="store_true")
+	parser.add_argument("-dbb", "--db-backend", help=textwrap.dedent('''\
+		Storage of the global sets table (-gdb) and the runtime queues (-rdb):
+		  postgres: the PostgreSQL server configured in configs.py (default)
+		  sqlite: an SQLite file of this machine, see -dbf. No server needed, the nodes are kept from run to run
+		'''), choices=['postgres', 'sqlite'], default="postgres")
+	parser.add_argument("-dbf", "--db-file", type=str, help=f"File of -dbb sqlite. Default is {DB_FILE}.", default=DB_FILE)
+	parser.add_argument("-gbf", "--gdb-bloom", help="Keep a Bloom filter of the global DB instead of all its hashes in memory, only the hashes it may have are looked up in the DB. It's saved next to the DB.", action="store_true")
+	parser.add_argument("-gpf", "--gdb-prefetch", type=int, help="Look up the next N nodes of the queue in the global DB at once: whether they're in it, their children and the bodies of their children. 0 looks up one node at a time (default).", default=0)
+	parser.add_argument("-gb", "--gdb-batch", type=int, help=f"Rows written to the global DB at once, 1 writes every node right away. Default is {GDB_BATCH_ROWS}.", default=GDB_BATCH_ROWS)
 	parser.add_argument("-z", "--sort-by-size", help="Always sort clauses by size in ascending order.", action="store_true")
 	parser.add_argument("-sm", "--start-mode", help="Use mode while prepare sub-processes (options as -m)", choices=['flo', 'flop', 'lo', 'lou', 'normal'], default=None)
+	parser.add_argument("-cs", "--compact-sets", help="Store the clauses of every node in flat arrays instead of Clause objects. Uses much less memory per node.", action="store_true")
+	parser.add_argument("-hm", "--hash-method", help=textwrap.dedent('''\
+		Hash method of the nodes:
+		  sha1: SHA1 of the packed binary form of the node (default without -gdb)
+		  fast: 128-bit non-cryptographic hash of the packed binary form (uses xxhash if installed)
+		  text: SHA1 of the text form of the node, the keys of the global DB tables (default and only method with -gdb)
+		'''), choices=['sha1', 'fast', 'text'], default=None)
+	parser.add_argument("-oi", "--occurrence-index", help="Keep an index of the clauses every literal occurs in, so branching only visits the clauses of the pivot variable. Can't be used with -cs.", action="store_true")
+	parser.add_argument("-up", "--propagate", help=textwrap.dedent('''\
+		Propagate every child right after branching, before it's converted to the solution mode:
+		  units: unit propagation
+		  pure: unit propagation and pure literal elimination
+		'''), choices=['units', 'pure'], default=None)
+	parser.add_argument("-dc", "--decompose", help="Solve the variable-disjoint parts of a node on their own, without adding their nodes to the graph. Identical parts are solved once.", action="store_true")
+	parser.add_argument("-pv", "--pivot-method", help=textwrap.dedent('''\
+		Variable every node is branched on:
+		  leftmost: first variable of the first clause (default)
+		  most-occurring: variable of the literal occurring in most clauses
+		  shortest-clause: first variable of the first shortest clause
+		  jw: highest two-sided Jeroslow-Wang score
+		'''), choices=['leftmost', 'most-occurring', 'shortest-clause', 'jw'], default="leftmost")
+	parser.add_argument("-ss", "--seen-set", type=int, metavar="SHARDS", help="Share the ids of the nodes taken by the workers in a set split over SHARDS actors, so no node is expanded by two workers. 0 = not shared (default).", default=0)
+	parser.add_argument("-ws", "--work-stealing", help="Give all nodes to the workers at once, workers without nodes steal the oldest nodes of busy workers. Shows the busy and idle time of every worker.", action="store_true")
+	parser.add_argument("-en", "--engine", help=textwrap.dedent('''\
+		Engine of the tree:
+		  queue: one node at a time, subtrees are solved on the workers (default)
+		  levels: one breadth first level at a time, the nodes of a level are expanded on the workers in chunks,
+		          and their children deduplicated in one pass. Shows the node counts of every level.
+		'''), choices=['queue', 'levels'], default="queue")
+	parser.add_argument("-sr", "--stream-results", help="Workers send the subgraph of their expanded nodes and their solutions while they run, instead of all at the end. The main process merges them meanwhile.", action="store_true")
+	parser.add_argument("-st", "--stats", help=textwrap.dedent('''\
+		Engine of the subgraph stats of every node, i.e. its unique nodes, redundant nodes and redundant hits:
+		  dag: one pass over the graph from the leaves up, with a bitset of the reachable edges of every node (default)
+		  dfs: a depth first search from every node, on the workers
+		  root: the stats of the root alone, from the number of parents of every node in one pass over the edges.
+		        Can't be used with -gdb
+		'''), choices=['dag', 'dfs', 'root'], default="dag")
+	parser.add_argument("-be", "--backend", help=textwrap.dedent('''\
+		Backend of the worker processes:
+		  auto: ray if a cluster address is given (-ra or RAY_ADDRESS) or -ss, -ws or -sr is used, otherwise local (default)
+		  ray: actors of a Ray cluster, Ray is started if no cluster address is given
+		  local: processes of this machine, without Ray
+		'''), choices=['auto', 'ray', 'local'], default="auto")
+	parser.add_argument("-ra", "--ray-address", type=str, help="Address of the Ray cluster to connect to.", default=None)
 	parser.add_argument("-thief", "--thief-method", help="VERY effizient for FACT of Purdom-Sabry input format: Always sort clauses by length and initial index.", action="store_true")
 	parser.add_argument("-fact", "--factorize", help="Factorize the input number if not prime.", action="store_true")
 	parser.add_argument("-mult", "--multiply", nargs=2, type=int, help="Multiply two numbers with bit-range. NOTE: will not generate total MULT-circuit!")
@@ -253,25 +298,14 @@ if __name__ == "__main__":
 	#     args.use_global_db = True
 
 
+	if args.seen_set < 0:
+		parser.error('-ss/--seen-set must be a positive number of shards')
+
 	if args.threads < 0:
 		logger.info("Option -t must be a positive number.")
 		parser.print_help()
 		sys.exit(3)
 		
-	# Determine the maximum number of CPUs available
-	max_cpus = os.cpu_count() if not ray.is_initialized() else int(cluster_resources.get("CPU", 1))
-
-	# Check if the -t argument is set and exceeds the maximum CPUs available
-	if args.threads and args.threads > max_cpus:
-		response = input(f"The specified number of threads (-t {args.threads}) exceeds the maximum available CPUs ({max_cpus}). "
-						"Would you like to use the maximum available CPUs instead? (y/n): ").strip().lower()
-		if response == "y":
-			args.threads = max_cpus
-			print(f"Setting number of threads to the maximum available CPUs: {max_cpus}")
-		else:
-			print("Please specify a lower value for -t or remove the -t option to use the maximum available CPUs.")
-			sys.exit(1)
-		
 	# at least one input must be provided
 	if args.line_input == None and args.line_input_file == None and args.dimacs == None:
 		logger.info("No input provided. Please provide any of the input arguments.")
@@ -288,10 +322,81 @@ if __name__ == "__main__":
 	if args.gdb_no_mem and not args.use_global_db:
 		parser.error('-gnm/--gdb-no-mem MUST be used with -gdb/--use-global-db option')
 
+	if args.gdb_bloom and not args.use_global_db:
+		parser.error('-gbf/--gdb-bloom MUST be used with -gdb/--use-global-db option')
+
+	if args.gdb_prefetch and not args.use_global_db:
+		parser.error('-gpf/--gdb-prefetch MUST be used with -gdb/--use-global-db option')
+
+	if args.gdb_prefetch < 0:
+		parser.error('-gpf/--gdb-prefetch must be a positive number of nodes')
+
+	if args.gdb_batch < 1:
+		parser.error('-gb/--gdb-batch must be a positive number of rows')
+
+	# the workers don't run in this directory (Ray actors run in their working_dir), they open the same file by its full path
+	args.db_file = os.path.abspath(args.db_file)
+
+
+	# the global DB tables are keyed by the SHA1 hashes of the text form of the sets, a table filled with other hashes
+	# would miss all nodes stored before
+	if args.use_global_db and args.hash_method not in (None, HASH_TEXT):
+		parser.error('-hm/--hash-method {0} can\'t be used with -gdb/--use-global-db option'.format(args.hash_method))
+	if args.hash_method is None:
+		args.hash_method = HASH_TEXT if args.use_global_db else HASH_SHA1
+
+	# the level engine keeps the whole tree in memory, and doesn't draw it
+	if args.engine == ENGINE_LEVELS and (args.use_global_db or args.use_runtime_db or args.output_graph_file):
+		parser.error('-en/--engine levels can\'t be used with -gdb, -rdb or -g options')
+
+	# the children stored in the global DB tables are branched on the left most variable
+	if args.pivot_method != PIVOT_LEFTMOST and args.use_global_db:
+		parser.error('-pv/--pivot-method can\'t be used with -gdb/--use-global-db option')
+
+	# the children stored in the global DB tables are the children of plain branching, and children found there aren't propagated
+	if args.propagate and args.use_global_db:
+		parser.error('-up/--propagate can\'t be used with -gdb/--use-global-db option')
+
+	# decomposed children are solved on their own and become True/False leaves, which aren't children of plain branching
+	if args.decompose and args.use_global_db:
+		parser.error('-dc/--decompose can\'t be used with -gdb/--use-global-db option')
+
+	# the stats of every node are saved in the global DB tables
+	if args.stats == STATS_ROOT and args.use_global_db:
+		parser.error('-st/--stats root can\'t be used with -gdb/--use-global-db option')
+
+	# compact sets keep no Clause objects to index
+	if args.occurrence_index and args.compact_sets:
+		parser.error('-oi/--occurrence-index can\'t be used with -cs/--compact-sets option')
 
 	if args.multiply and ((args.multiply[0] <= 1) or (args.multiply[1] <= 1)):
 		parser.error('-mult/--multiply option MUST be used with integers > 1')
 
+	# the shared seen set, work stealing and streamed results use Ray actors
+	needs_ray = bool(args.seen_set or args.work_stealing or args.stream_results)
+	args.backend = Executors.select_backend(args.backend, args.ray_address, needs_ray)
+	if args.backend == BACKEND_LOCAL and needs_ray:
+		parser.error('-ss, -ws and -sr options can\'t be used with -be/--backend local')
+
+	# Ray is only started when it's used
+	if args.backend == BACKEND_RAY:
+		cluster_resources = Executors.init_ray(args.ray_address)
+	print(f"\n\n\nNDP started.")
+
+	# Determine the maximum number of CPUs available
+	max_cpus = Executors.get_cpu_count()
+
+	# Check if the -t argument is set and exceeds the maximum CPUs available
+	if args.threads and args.threads > max_cpus:
+		response = input(f"The specified number of threads (-t {args.threads}) exceeds the maximum available CPUs ({max_cpus}). "
+						"Would you like to use the maximum available CPUs instead? (y/n): ").strip().lower()
+		if response == "y":
+			args.threads = max_cpus
+			print(f"Setting number of threads to the maximum available CPUs: {max_cpus}")
+		else:
+			print("Please specify a lower value for -t or remove the -t option to use the maximum available CPUs.")
+			sys.exit(1)
+
 	if args.verbos:
 		logger.setLevel(logging.INFO)
 	elif args.very_verbos:
@@ -0,0 +1,108 @@
+#	bench_allocations.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# Measure the memory allocations of branching nodes. The first N nodes of the tree of every input (breadth first) are
+# branched, and for every node it counts:
+#   evaluate: memory blocks allocated by evaluate() and held by the two children
+#   to_lo:    change of allocated blocks while the children are converted to L.O. condition
+#   total:    memory blocks held by the two children in L.O. condition
+# the kB columns are the same in bytes (traced with tracemalloc). All nodes are kept alive until the end, so freeing
+# nodes doesn't hide allocations.
+#
+# usage: python3 tools/bench_allocations.py [-m MODE] [-n NODES] [-cs] [-oi] [inputs ...]
+# by default Multi14bit.txt and FACT701-14bit.dimacs (preprocessed as with -fact) are used.
+
+import os
+import sys
+import argparse
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir))
+from configs import *
+from Set import Set
+from common import read_input
+
+
+# memory blocks allocated by the interpreter, and bytes traced by tracemalloc
+def allocated():
+    return sys.getallocatedblocks(), tracemalloc.get_traced_memory()[0]
+
+
+# returns the allocations per node of evaluate() and to_lo_condition() as (blocks, bytes) pairs
+def measure(root_set, mode, max_nodes):
+    child_mode = MODE_LOU if mode == MODE_LO else mode
+    root_set.to_lo_condition(mode)
+    queue = [root_set]
+    seen = {root_set.get_hash()}
+    nodes = 0
+    totals = [0, 0, 0, 0]
+    kept = []
+
+    tracemalloc.start()
+    while queue and nodes < max_nodes:
+        cnf_set = queue.pop(0)
+        nodes += 1
+
+        blocks, size = allocated()
+        children = cnf_set.evaluate()
+        blocks_evaluated, size_evaluated = allocated()
+        for child in children:
+            if child.value == None:
+                child.to_lo_condition(child_mode)
+        blocks_lo, size_lo = allocated()
+
+        totals[0] += blocks_evaluated - blocks
+        totals[1] += size_evaluated - size
+        totals[2] += blocks_lo - blocks_evaluated
+        totals[3] += size_lo - size_evaluated
+        kept.append(children)
+
+        for child in children:
+            if child.value == None and child.get_hash(force_recalculate=True) not in seen:
+                seen.add(child.get_hash())
+                queue.append(child)
+    tracemalloc.stop()
+
+    return nodes, [t / nodes for t in totals]
+
+
+if __name__ == "__main__":
+    inputs_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'inputs')
+    parser = argparse.ArgumentParser(description="Measure allocations per node")
+    parser.add_argument("-m", "--mode", choices=['flo', 'flop', 'lo', 'lou', 'normal'], default="flo")
+    parser.add_argument("-n", "--nodes", type=int, help="Nodes per input", default=100)
+    parser.add_argument("-cs", "--compact-sets", help="Use CompactSet nodes", action="store_true")
+    parser.add_argument("-oi", "--occurrence-index", help="Branch with the occurrences index", action="store_true")
+    parser.add_argument("inputs", nargs='*', default=[os.path.join(inputs_dir, 'Multi14bit.txt'), os.path.join(inputs_dir, 'FACT701-14bit.dimacs')])
+    args = parser.parse_args()
+
+    Set.use_occurrences = args.occurrence_index
+
+    print(f"mode = {args.mode}")
+    print(f"{'input':<45} {'nodes':>6} {'evaluate':>9} {'kB':>8} {'to_lo':>9} {'kB':>8} {'total':>9} {'kB':>8}")
+    for file_name in args.inputs:
+        root_set = read_input(file_name)
+        if args.compact_sets:
+            from CompactSet import CompactSet
+            root_set = CompactSet.from_set(root_set)
+
+        nodes, (blocks_evaluate, size_evaluate, blocks_lo, size_lo) = measure(root_set, args.mode, args.nodes)
+        print(f"{os.path.basename(file_name):<45} {nodes:>6} {blocks_evaluate:>9.0f} {size_evaluate/1024:>8.1f} {blocks_lo:>9.0f} {size_lo/1024:>8.1f} "
+              f"{blocks_evaluate+blocks_lo:>9.0f} {(size_evaluate+size_lo)/1024:>8.1f}")
@@ -0,0 +1,104 @@
+#	bench_lo_condition.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# Benchmark of Set.to_lo_condition() (Normalizer) against the old loop Set.to_lo_condition_iterative().
+# The first N nodes of the tree of every input (breadth first) are collected before their conversion, then both
+# methods convert copies of the same nodes. The results are compared and the tool fails if they are not identical.
+#
+# usage: python3 tools/bench_lo_condition.py [-m MODE] [-n NODES] [inputs ...]
+# by default all FACT (preprocessed as with -fact) and Multi files in inputs/ are used.
+
+import os
+import sys
+import glob
+import time
+import argparse
+from copy import deepcopy
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir))
+from configs import *
+from common import read_input
+
+
+# collect the first nodes of the tree before their conversion to L.O.
+def collect_nodes(root_set, mode, max_nodes):
+    child_mode = MODE_LOU if mode == MODE_LO else mode
+    nodes = [(deepcopy(root_set), mode)]
+    root_set.to_lo_condition(mode)
+    queue = [root_set]
+    seen = {root_set.get_hash()}
+    while queue and len(nodes) < max_nodes:
+        cnf_set = queue.pop(0)
+        for child in cnf_set.evaluate():
+            if child.value != None:
+                continue
+            nodes.append((deepcopy(child), child_mode))
+            child.to_lo_condition(child_mode)
+            if child.get_hash() not in seen:
+                seen.add(child.get_hash())
+                queue.append(child)
+    return nodes
+
+
+def run(nodes, method):
+    sets = [deepcopy(cnf_set) for cnf_set, mode in nodes]
+    start_time = time.perf_counter()
+    for cnf_set, (_, mode) in zip(sets, nodes):
+        getattr(cnf_set, method)(mode)
+    return sets, time.perf_counter() - start_time
+
+
+def same_result(set1, set2):
+    return [(cl.raw, cl.initial_index) for cl in set1.clauses] == [(cl.raw, cl.initial_index) for cl in set2.clauses] and \
+        set1.final_names_map == set2.final_names_map and set1.highest_occurring_var == set2.highest_occurring_var and \
+        set1.lo_rounds == set2.lo_rounds
+
+
+if __name__ == "__main__":
+    inputs_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'inputs')
+    parser = argparse.ArgumentParser(description="Benchmark L.O. conversion")
+    parser.add_argument("-m", "--mode", choices=['flo', 'flop', 'lo', 'lou', 'normal'], default="flo")
+    parser.add_argument("-n", "--nodes", type=int, help="Nodes per input", default=200)
+    parser.add_argument("inputs", nargs='*', default=sorted(glob.glob(os.path.join(inputs_dir, 'FACT*.dimacs')) + glob.glob(os.path.join(inputs_dir, 'Multi*.txt'))))
+    args = parser.parse_args()
+
+    print(f"mode = {args.mode}")
+    print(f"{'input':<45} {'nodes':>6} {'avg rounds':>10} {'max rounds':>10} {'loop ms':>9} {'engine ms':>9} {'speedup':>8}")
+    failed = False
+    for file_name in args.inputs:
+        try:
+            root_set = read_input(file_name)
+        except Exception as e:
+            print(f"{os.path.basename(file_name)}: skipped, {e}")
+            continue
+
+        nodes = collect_nodes(root_set, args.mode, args.nodes)
+        old_sets, old_time = run(nodes, 'to_lo_condition_iterative')
+        new_sets, new_time = run(nodes, 'to_lo_condition')
+
+        if not all(same_result(s1, s2) for s1, s2 in zip(old_sets, new_sets)):
+            print(f"{os.path.basename(file_name)}: results are NOT identical!")
+            failed = True
+
+        rounds = [s.lo_rounds for s in old_sets]
+        print(f"{os.path.basename(file_name):<45} {len(nodes):>6} {sum(rounds)/len(rounds):>10.2f} {max(rounds):>10} "
+              f"{old_time*1000/len(nodes):>9.3f} {new_time*1000/len(nodes):>9.3f} {old_time/new_time:>7.1f}x")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,84 @@
+#	bench_pivot.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# Compare the pivot strategies: unique nodes and runtime of the whole tree of every input, for every strategy.
+# The tree is built in one process, breadth first as in PatternSolver.process_nodes_queue(). A tree is stopped at the
+# node limit, and its count is then shown as ">limit".
+#
+# usage: python3 tools/bench_pivot.py [-m MODE] [-l LIMIT] [-p PIVOTS] [inputs ...]
+# by default the small FACT (preprocessed as with -fact) and Multi files in inputs/ are used.
+
+import os
+import sys
+import time
+import argparse
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir))
+from configs import *
+from Set import Set
+from common import read_input
+
+PIVOTS = [PIVOT_LEFTMOST, PIVOT_MOST_OCCURRING, PIVOT_SHORTEST_CLAUSE, PIVOT_JEROSLOW_WANG]
+INPUTS = ['FACT7-4bit.dimacs', 'FACT11-5bit.dimacs', 'FACT17-7bit.dimacs', 'FACT32-8bit.dimacs', 'FACT71-10bit.dimacs',
+          'FACT131-11bit.dimacs', 'Multi7bit.txt', 'Multi8bit.txt']
+
+
+# returns the number of unique nodes, None if the limit is reached
+def count_nodes(root_set, mode, limit):
+    child_mode = MODE_LOU if mode == MODE_LO else mode
+    root_set.to_lo_condition(mode)
+    root_set.id = root_set.get_hash(force_recalculate=True)
+    seen = {root_set.id}
+    queue = [root_set]
+    while queue:
+        cnf_set = queue.pop(0)
+        for child in cnf_set.evaluate():
+            if child.value != None:
+                continue
+            child.to_lo_condition(child_mode)
+            child.id = child.get_hash(force_recalculate=True)
+            if child.id not in seen:
+                if len(seen) >= limit:
+                    return None
+                seen.add(child.id)
+                queue.append(child)
+    return len(seen)
+
+
+if __name__ == "__main__":
+    inputs_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'inputs')
+    parser = argparse.ArgumentParser(description="Benchmark pivot strategies")
+    parser.add_argument("-m", "--mode", choices=['flo', 'flop', 'lo', 'lou', 'normal'], default="flo")
+    parser.add_argument("-l", "--limit", type=int, help="Max unique nodes per tree", default=20000)
+    parser.add_argument("-p", "--pivots", nargs='+', choices=PIVOTS, default=PIVOTS)
+    parser.add_argument("inputs", nargs='*', default=[os.path.join(inputs_dir, f) for f in INPUTS])
+    args = parser.parse_args()
+
+    print(f"mode = {args.mode}, limit = {args.limit:,} nodes")
+    print(f"{'input':<25}" + ''.join(f"{pivot:>17} {'sec':>7}" for pivot in args.pivots))
+    for file_name in args.inputs:
+        line = f"{os.path.basename(file_name):<25}"
+        for pivot in args.pivots:
+            Set.pivot_method = pivot
+            root_set = read_input(file_name)
+            start_time = time.perf_counter()
+            nodes = count_nodes(root_set, args.mode, args.limit)
+            line += f"{(f'{nodes:,}' if nodes else f'>{args.limit:,}'):>17} {time.perf_counter() - start_time:>7.1f}"
+        print(line, flush=True)
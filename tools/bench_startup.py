@@ -0,0 +1,85 @@
+#	bench_startup.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# Measure the start-up of main.py on a trivial single line input: the time until the root node is solved
+# (time to first node), the total runtime, and the modules that take longest to import, from python -X importtime.
+# Every backend is run a number of times, the median times are shown.
+#
+# usage: python3 tools/bench_startup.py [-l INPUT] [-n RUNS] [-b BACKENDS] [-i IMPORTS] [-- MAIN OPTIONS]
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+MAIN = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'main.py')
+FIRST_NODE_LINE = "Solving problem ID"
+
+
+# run main.py once, returns the time to the first node, the total time, and the cumulative import time of every
+# top level module in seconds
+def run_main(line_input, backend, main_options):
+    command = [sys.executable, '-X', 'importtime', MAIN, '-l', line_input, '-v', '-b', '-be', backend] + main_options
+    start_time = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    first_node_time = None
+    imports = {}
+    for line in process.stdout:
+        if line.startswith('import time:'):
+            # import time: self [us] | cumulative | imported package, nested imports are indented
+            _, cumulative, name = line.split('|')
+            if not name[1:].startswith(' ') and cumulative.strip().isdigit():
+                imports[name.strip()] = int(cumulative) / 1e6
+        elif first_node_time is None and FIRST_NODE_LINE in line:
+            first_node_time = time.perf_counter() - start_time
+    process.wait()
+    total_time = time.perf_counter() - start_time
+    if process.returncode:
+        sys.exit(f"main.py failed with exit code {process.returncode}: {' '.join(command)}")
+    return first_node_time, total_time, imports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the start-up of main.py")
+    parser.add_argument("-l", "--line-input", help="Input set in one line", default="1|2&-1|2")
+    parser.add_argument("-n", "--runs", type=int, help="Runs per backend", default=3)
+    parser.add_argument("-b", "--backends", nargs='+', choices=['local', 'ray'], default=['local', 'ray'])
+    parser.add_argument("-i", "--imports", type=int, help="Number of slowest imports shown", default=8)
+    parser.add_argument("main_options", nargs='*', help="Further options of main.py, after --")
+    args = parser.parse_args()
+
+    print(f"input = {args.line_input}, {args.runs} runs per backend, median times in seconds")
+    print(f"{'backend':<10}{'first node':>12}{'total':>10}{'imports':>10}")
+    slowest_imports = {}
+    for backend in args.backends:
+        runs = [run_main(args.line_input, backend, args.main_options) for _ in range(args.runs)]
+        first_node_time = statistics.median(run[0] for run in runs)
+        total_time = statistics.median(run[1] for run in runs)
+        imports = runs[-1][2]
+        slowest_imports[backend] = sorted(imports.items(), key=lambda item: -item[1])[:args.imports]
+        print(f"{backend:<10}{first_node_time:>12.2f}{total_time:>10.2f}{sum(imports.values()):>10.2f}", flush=True)
+
+    for backend, imports in slowest_imports.items():
+        print(f"\nslowest imports of the {backend} backend:")
+        for name, import_time in imports:
+            print(f"  {name:<30}{import_time:>8.3f}")
@@ -0,0 +1,149 @@
+#	check_clause_order.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# Check that the order the solver sorts clauses in is exactly the order of Clause.__lt__.
+# The Normalizer (Set.to_lo_condition()) sorts clauses as tuples of encoded literals (Clause.encode_literals()), so the
+# clause lists it sorts are recorded while the first N nodes of the tree of every input are converted (breadth first, in
+# every mode). For these lists, and for some hand written edge cases:
+#   - every pair of clauses (or a random sample of pairs on large nodes) compares the same with __lt__ and as encoded tuples
+#   - the clauses, shuffled, are sorted to the same order with __lt__, as encoded tuples and with Clause.get_sort_key()
+# The tool fails if any difference is found.
+#
+# usage: python3 tools/check_clause_order.py [-n NODES] [-p PAIRS] [inputs ...]
+# by default all FACT (preprocessed as with -fact) and Multi files in inputs/ are used.
+
+import os
+import sys
+import glob
+import random
+import argparse
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir))
+from configs import *
+from Clause import Clause
+from common import read_input
+from Normalizer import Normalizer
+
+MODES = [MODE_FLO, MODE_FLOP, MODE_LO, MODE_LOU, MODE_NORMAL]
+
+EDGE_CASES = [
+    [[5], [-5]], [[-5], [5]], [[3], [-5]], [[-3], [5]], [[1, 2], [1]], [[1], [1, 2]], [[1, 2], [1, -2]],
+    [[1, -2], [1, 2]], [[-1, 2, 3], [-1, 2]], [[1, 2, 3], [1, 2, 3]], [[2, 3], [-2, 3]], [[-2, 3], [2, 3]],
+    [[1, -2, 3], [1, 2, 4]], [[-7, 8], [7, -8]], [[100, -101], [-100, 101]], [[4, 9], [4, -9]],
+]
+
+
+# the clause lists the Normalizer sorts, as tuples of encoded literals: the clauses of every rename round
+def record_sorted_lists(clause_lists):
+    rename = Normalizer.rename
+
+    def recording_rename(clauses):
+        result = rename(clauses)
+        clause_lists.append(result[0])
+        return result
+
+    Normalizer.rename = staticmethod(recording_rename)
+
+
+# convert the first nodes of the tree to L.O. as the solver does, the Normalizer records the lists it sorts
+def convert_nodes(root_set, mode, max_nodes):
+    child_mode = MODE_LOU if mode == MODE_LO else mode
+    root_set.to_lo_condition(mode)
+    nodes = 1
+    queue = [root_set]
+    seen = {root_set.get_hash()}
+    while queue and nodes < max_nodes:
+        cnf_set = queue.pop(0)
+        for child in cnf_set.evaluate():
+            if child.value != None:
+                continue
+            child.to_lo_condition(child_mode)
+            nodes += 1
+            if child.get_hash() not in seen:
+                seen.add(child.get_hash())
+                queue.append(child)
+
+
+# returns the number of differences found
+def check(encoded_clauses, max_pairs, rnd):
+    errors = 0
+    clauses = []
+    for encoded in encoded_clauses:
+        clauses.append(Clause(None))
+        clauses[-1].raw = Normalizer.decode(encoded)
+    keys = list(encoded_clauses)
+    n = len(clauses)
+    if n * n <= max_pairs:
+        pairs = [(i, j) for i in range(n) for j in range(n)]
+    else:
+        pairs = [(rnd.randrange(n), rnd.randrange(n)) for _ in range(max_pairs)]
+
+    for i, j in pairs:
+        if (clauses[i] < clauses[j]) != (keys[i] < keys[j]):
+            print(f"  {clauses[i].raw} < {clauses[j].raw}: __lt__ = {clauses[i] < clauses[j]}, encoded = {keys[i] < keys[j]}")
+            errors += 1
+
+    positions = list(range(n))
+    rnd.shuffle(positions)
+    by_lt = [id(cl) for cl in sorted([clauses[i] for i in positions])]
+    by_encoding = [id(clauses[i]) for i in sorted(positions, key=keys.__getitem__)]
+    by_sort_key = [id(cl) for cl in sorted([clauses[i] for i in positions], key=Clause.get_sort_key)]
+    if by_lt != by_encoding or by_lt != by_sort_key:
+        print(f"  sorted order differs for a list of {n} clauses")
+        errors += 1
+
+    return errors
+
+
+if __name__ == "__main__":
+    inputs_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'inputs')
+    parser = argparse.ArgumentParser(description="Check the clause order of the Normalizer against Clause.__lt__")
+    parser.add_argument("-n", "--nodes", type=int, help="Nodes per input and mode", default=50)
+    parser.add_argument("-p", "--pairs", type=int, help="Max pairs of clauses compared per node", default=20000)
+    parser.add_argument("inputs", nargs='*', default=sorted(glob.glob(os.path.join(inputs_dir, 'FACT*.dimacs')) + glob.glob(os.path.join(inputs_dir, 'Multi*.txt'))))
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    rename = Normalizer.rename
+    errors = 0
+    for case in EDGE_CASES:
+        errors += check([Normalizer.encode(raw) for raw in case], args.pairs, rnd)
+    print(f"{'edge cases':<45} {len(EDGE_CASES):>6} lists, errors: {errors}")
+
+    for file_name in args.inputs:
+        for mode in MODES:
+            try:
+                root_set = read_input(file_name)
+            except Exception as e:
+                print(f"{os.path.basename(file_name)}: skipped, {e}")
+                break
+
+            input_errors = 0
+            clause_lists = []
+            record_sorted_lists(clause_lists)
+            convert_nodes(root_set, mode, args.nodes)
+            Normalizer.rename = staticmethod(rename)
+            for clauses in clause_lists:
+                input_errors += check(clauses, args.pairs, rnd)
+            print(f"{os.path.basename(file_name) + ' ' + mode:<45} {len(clause_lists):>6} lists, errors: {input_errors}")
+            errors += input_errors
+
+    print("identical" if errors == 0 else f"{errors} differences found")
+    sys.exit(1 if errors else 0)
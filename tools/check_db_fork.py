@@ -0,0 +1,115 @@
+#	check_db_fork.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+
+# Check that forked workers don't break the PostgreSQL sessions of their parent (DbAdaptor.py). A forked process gets
+# copies of the connections of its parent, which share their sockets with the parent's sessions: closing one of them in
+# the worker ends the session of the parent. For every case a worker is forked while the parent has a DbAdapter in use
+# and an idle connection in its pool, then both are used again by the parent:
+#   - reconnect:    the worker takes a connection of its own with DbAdapter.reconnect()
+#   - new adapter:  the worker creates and deletes a DbAdapter, which resets the pool of the process
+#   - del adapter:  the worker deletes the DbAdapter of its parent
+#   - worker pool:  the workers of the local backend (Executors.LocalWorkerPool) look up nodes in the global DB
+# The tool fails if the parent can't use a connection afterwards. It needs the PostgreSQL server of configs.py.
+#
+# usage: python3 tools/check_db_fork.py
+
+import os
+import gc
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir))
+from configs import *
+import DbAdaptor
+import Executors
+from PatternSolver import PatternSolver, PatternSolverArgs
+
+TABLE_NAME = "check_db_fork"
+
+
+# returns True if the connection of the DbAdapter still works
+def is_working(db_adaptor):
+    try:
+        db_adaptor.cur.execute("SELECT 1")
+        db_adaptor.cur.fetchone()
+        db_adaptor.conn.commit()
+        return True
+    except Exception as error:
+        print(f"  {str(error).strip()}")
+        return False
+
+
+def run_in_fork(case, db_adaptor):
+    pid = os.fork()
+    if pid == 0:
+        if case == 'reconnect':
+            db_adaptor.reconnect()
+            db_adaptor.gs_does_hash_exist(TABLE_NAME, b'\0')
+        elif case == 'new adapter':
+            other = DbAdaptor.DbAdapter()
+            other.gs_does_hash_exist(TABLE_NAME, b'\0')
+            del other
+        elif case == 'del adapter':
+            del db_adaptor
+        gc.collect()
+        # as a forked worker of multiprocessing exits
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+
+def run_in_pool(pattern_solver):
+    pool = Executors.LocalWorkerPool(pattern_solver, 2)
+    for i in range(8):
+        pool.submit('is_set_in_gdb', bytes([i]) * 20)
+    while pool.pending_count():
+        pool.get_next()
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    args = PatternSolverArgs()
+    args.use_global_db = args.gdb_no_mem = True
+    pattern_solver = PatternSolver(args=args)
+    pattern_solver.global_table_name = TABLE_NAME
+    db_adaptor = pattern_solver.db_adaptor
+    db_adaptor.gs_create_table(TABLE_NAME)
+
+    failed = False
+    for case in ['reconnect', 'new adapter', 'del adapter', 'worker pool']:
+        # an idle connection in the pool of the parent
+        idle_adaptor = DbAdaptor.DbAdapter()
+        del idle_adaptor
+
+        if case == 'worker pool':
+            run_in_pool(pattern_solver)
+        else:
+            run_in_fork(case, db_adaptor)
+
+        idle_adaptor = DbAdaptor.DbAdapter()
+        working = is_working(db_adaptor) and is_working(idle_adaptor)
+        del idle_adaptor
+        print(f"{case:<15} {'ok' if working else 'the connections of the parent are broken'}")
+        failed |= not working
+        if not working:
+            DbAdaptor.idle_connections.clear()
+            db_adaptor = pattern_solver.db_adaptor = DbAdaptor.DbAdapter()
+
+    db_adaptor.gs_drop_table(TABLE_NAME)
+    sys.exit(1 if failed else 0)
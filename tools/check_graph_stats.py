@@ -0,0 +1,136 @@
+#	check_graph_stats.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# Check that GraphStats.construct_dag_stats() gives the same stats as the depth first search of
+# PatternSolver.do_get_node_subgraph_stats(), for every node of the following graphs, and that
+# GraphStats.construct_root_stats() gives the same stats for their root:
+#   - random DAGs, with shared subgraphs and nodes having the same child twice
+#   - the graphs of the inputs, up to N nodes (breadth first, as in PatternSolver.process_nodes_queue())
+# The tool fails if any difference is found.
+#
+# usage: python3 tools/check_graph_stats.py [-n NODES] [-r RANDOM] [-m MODE] [inputs ...]
+# by default the small FACT (preprocessed as with -fact) and Multi files in inputs/ are used.
+
+import os
+import sys
+import time
+import random
+import argparse
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir))
+from configs import *
+from common import read_input
+from PatternSolver import PatternSolver, PatternSolverArgs
+from CsrGraph import CsrGraph
+import GraphStats
+
+INPUTS = ['FACT7-4bit.dimacs', 'FACT11-5bit.dimacs', 'FACT17-7bit.dimacs', 'FACT32-8bit.dimacs', 'FACT71-10bit.dimacs',
+          'Multi7bit.txt', 'Multi8bit.txt']
+
+
+# returns the root id and the children of every node of the graph of the input, the nodes left in the queue at the limit
+# have no children
+def build_graph(root_set, mode, limit):
+    child_mode = MODE_LOU if mode == MODE_LO else mode
+    root_set.to_lo_condition(mode)
+    root_set.id = root_set.get_hash(force_recalculate=True)
+    nodes_children = {root_set.id: []}
+    queue = [root_set]
+    while queue and len(nodes_children) < limit:
+        cnf_set = queue.pop(0)
+        for child in cnf_set.evaluate():
+            if child.value != None:
+                continue
+            child.to_lo_condition(child_mode)
+            child.id = child.get_hash(force_recalculate=True)
+            if child.id not in nodes_children:
+                nodes_children[child.id] = []
+                queue.append(child)
+            nodes_children[cnf_set.id].append(child.id)
+    return root_set.id, nodes_children
+
+
+# a DAG of the given size, node 0 is the root and can reach all other nodes. The nodes are named by 20 bytes as the hashes
+def random_dag(size, rnd):
+    names = [node_id.to_bytes(20, 'big') for node_id in range(size)]
+    nodes_children = {names[0]: []}
+    for node_id in range(1, size):
+        parent_id = rnd.randrange(node_id)
+        nodes_children[names[parent_id]].append(names[node_id])
+        nodes_children[names[node_id]] = []
+    for node_id in range(size - 1):
+        for _ in range(rnd.randrange(3)):
+            nodes_children[names[node_id]].append(names[rnd.randrange(node_id + 1, size)])
+    return names[0], nodes_children
+
+
+# returns the number of nodes with different stats
+def check(solver, root_id, nodes_children):
+    graph = CsrGraph(nodes_children, root_id)
+    start_time = time.perf_counter()
+    dfs_stats = solver.do_get_node_subgraph_stats(0, graph.size(), graph)
+    dfs_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    dag_stats, dag_root_redundants = GraphStats.construct_dag_stats(graph)
+    dag_time = time.perf_counter() - start_time
+
+    errors = 0
+    for node, uniques, redundants, redundant_hits, root_redundants in dfs_stats:
+        if tuple(dag_stats[node]) != (uniques, redundants, redundant_hits):
+            print(f"  node {graph.get_hash(node)}: dfs = {(uniques, redundants, redundant_hits)}, dag = {tuple(dag_stats[node])}")
+            errors += 1
+        if root_redundants is not None and dict(root_redundants) != dag_root_redundants:
+            print(f"  redundant hits of the root's subgraph differ")
+            errors += 1
+
+    root_stats, root_redundants = GraphStats.construct_root_stats(graph)
+    if tuple(root_stats[0]) != tuple(dag_stats[0]) or root_redundants != dag_root_redundants:
+        print(f"  root: dag = {tuple(dag_stats[0])}, root = {tuple(root_stats[0])}")
+        errors += 1
+    print(f"  {graph.size():>7,} nodes, dfs {dfs_time:>7.2f} sec, dag {dag_time:>7.2f} sec, errors: {errors}", flush=True)
+    return errors
+
+
+if __name__ == "__main__":
+    inputs_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir, 'inputs')
+    parser = argparse.ArgumentParser(description="Check the DAG stats against the depth first search")
+    parser.add_argument("-n", "--nodes", type=int, help="Max nodes of the graph of every input", default=5000)
+    parser.add_argument("-r", "--random", type=int, help="Number of random DAGs", default=20)
+    parser.add_argument("-m", "--mode", choices=['flo', 'flop', 'lo', 'lou', 'normal'], default="flo")
+    parser.add_argument("inputs", nargs='*', default=[os.path.join(inputs_dir, f) for f in INPUTS])
+    args = parser.parse_args()
+
+    sys.setrecursionlimit(100000)
+    solver = PatternSolver(args=PatternSolverArgs())
+    rnd = random.Random(0)
+    errors = 0
+
+    for n in range(args.random):
+        size = rnd.choice([1, 2, 10, 100, 1000])
+        print(f"random DAG #{n}")
+        errors += check(solver, *random_dag(size, rnd))
+
+    for file_name in args.inputs:
+        print(f"{os.path.basename(file_name)} {args.mode}")
+        errors += check(solver, *build_graph(read_input(file_name), args.mode, args.nodes))
+
+    print("identical" if errors == 0 else f"{errors} differences found")
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,39 @@
+#	common.py
+#
+#	Non-Deterministic Processor (NDP) - efficient parallel SAT-solver
+#	Copyright (c) 2023 GridSAT Stiftung
+#
+#	This program is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Affero General Public License as published by
+#	the Free Software Foundation, either version 3 of the License, or
+#	(at your option) any later version.
+#
+#	This program is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU Affero General Public License for more details.
+#
+#	You should have received a copy of the GNU Affero General Public License
+#	along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#	GridSAT Stiftung - Georgstr. 11 - 30159 Hannover - Germany - ipfs: gridsat.eth/ - info@gridsat.io
+#
+
+# Helpers shared by the tools.
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir))
+from configs import *
+from InputReader import InputReader
+from Factorizer import Factorizer
+
+
+# read a DIMACS input as the solver does, FACT files are preprocessed as with -fact. The variables keep their names
+def read_input(file_name):
+    cnf_set = InputReader(INPUT_DIMACS, open(file_name, 'r')).get_cnf_set()
+    if os.path.basename(file_name).startswith('FACT'):
+        Factorizer().preprocess_set(cnf_set)
+    vars = cnf_set.get_variables()
+    cnf_set.original_values = dict(zip(vars, vars))
+    return cnf_set